@@ -1,15 +1,16 @@
 from datetime import datetime, timezone
-from typing import Dict, List, TypedDict, Any
-from typing_extensions import NotRequired
+from typing import Dict, List, Any
 import json
 import logging
 from langchain_core.messages import BaseMessage, AIMessage, HumanMessage
 from langchain_core.prompts import ChatPromptTemplate
 from langgraph.graph import StateGraph, END
-from src.langgraph_mcp.tool_execution import execute_tool, route_request
+from src.langgraph_mcp.tool_execution import execute_tool, route_request, run_tool_loop
 from src.langgraph_mcp.transport_manager import transport_manager
 from src.langgraph_mcp.configuration import Configuration
 from src.langgraph_mcp import mcp_wrapper as mcp
+from src.langgraph_mcp.prompt_renderer import prompt_renderer
+from src.langgraph_mcp.state import GraphState
 from src.langgraph_mcp.utils import get_message_text, load_chat_model
 from src.langgraph_mcp.cleanup_manager import cleanup_manager
 
@@ -29,11 +30,6 @@ Current tools available:
 DO NOT ask the user for clarification unless the request is completely unclear.
 When using search tools, formulate and execute the search directly."""
 
-class GraphState(TypedDict):
-    messages: List[BaseMessage]
-    current_mcp_server: NotRequired[str]
-    tool_outputs: List[str]
-
 # Initialize prompt templates
 router_prompt = ChatPromptTemplate.from_messages([
     ("system", TOOL_INSTRUCTIONS),
@@ -41,20 +37,8 @@ router_prompt = ChatPromptTemplate.from_messages([
 ])
 
 def convert_to_langchain_tools(mcp_tools: List[Dict]) -> List[Dict]:
-    """Convert MCP tools to LangChain format"""
-    langchain_tools = []
-    for tool in mcp_tools:
-        if isinstance(tool, dict) and 'function' in tool:
-            func = tool['function']
-            langchain_tools.append({
-                'type': 'function',
-                'function': {
-                    'name': func.get('name', ''),
-                    'description': func.get('description', ''),
-                    'parameters': func.get('parameters', {'type': 'object', 'properties': {}})
-                }
-            })
-    return langchain_tools
+    """Convert MCP tools to LangChain format (cached per tool catalog)"""
+    return list(prompt_renderer.tool_schemas(mcp_tools))
 
 async def execute_tool_with_cleanup(name: str, tool_type: str, config: Dict, query: str) -> Dict:
     """Execute tool and ensure proper cleanup"""
@@ -63,35 +47,26 @@ async def execute_tool_with_cleanup(name: str, tool_type: str, config: Dict, que
         if not server_config:
             raise ValueError(f"Tool configuration not found: {tool_type}")
 
-        # Get tools
-        tools = await mcp.apply(tool_type, server_config, mcp.GetTools())
-        
         # Execute search directly without asking for clarification
         if tool_type == "brave-search":
-            tool_name = "brave_web_search"
-            tool_args = {"query": query}
-        else:
-            model = load_chat_model(config.get("execution_model"))
-            result = await model.bind_tools(convert_to_langchain_tools(tools)).ainvoke(query)
-            
-            if not result.additional_kwargs.get('tool_calls'):
-                return {"content": result.content}
-                
-            tool_call = result.additional_kwargs['tool_calls'][0]
-            tool_name = tool_call['function']['name']
-            tool_args = json.loads(tool_call['function']['arguments'])
-
-        # Execute tool
-        result = await mcp.apply(tool_type, server_config, mcp.RunTool(tool_name, **tool_args))
-        
-        # Process result
-        if isinstance(result, str):
-            try:
-                result = json.loads(result)
-            except json.JSONDecodeError:
-                pass
-                
-        return {"content": str(result)}
+            result = await mcp.apply(tool_type, server_config, mcp.RunTool("brave_web_search", query=query))
+
+            # Process result
+            if isinstance(result, str):
+                try:
+                    result = json.loads(result)
+                except json.JSONDecodeError:
+                    pass
+
+            return {"content": str(result)}
+
+        # Let the model run every tool call it needs, in parallel, over several rounds
+        configurable = {"mcp_server_config": config}
+        if config.get("execution_model"):
+            configurable["execution_model"] = config["execution_model"]
+        configuration = Configuration.from_runnable_config({"configurable": configurable})
+        result = await run_tool_loop(config, [tool_type], query, configuration)
+        return {"content": result["content"]}
 
     except Exception as e:
         logger.error(f"Error executing tool {name}: {e}")
@@ -101,8 +76,8 @@ async def execute_tool_with_cleanup(name: str, tool_type: str, config: Dict, que
 from src.langgraph_mcp.tool_execution import route_request, execute_tool
 
 def should_continue(state: GraphState) -> str:
-    logger.debug(f"GraphState: {state}")
-    return "execute_tool" if state.get("current_mcp_server") else END
+    logger.debug("GraphState: %s", state)
+    return "execute_tool" if state.route else END
 
 # Create and configure the graph
 workflow = StateGraph(GraphState)
@@ -0,0 +1,120 @@
+"""
+Benchmark per-step state cost: the previous TypedDict state against GraphState.
+
+Both graphs have the production shape (route_request -> execute_tool) with
+stub nodes that return the same kind of updates the real nodes do, so the
+numbers isolate state handling: channel updates, reducers, coercion into
+the state schema, and serializing the final state with LangGraph's
+checkpoint serializer.
+
+The comparison is like-for-like: the legacy `messages` channel has no
+reducer, so its nodes return the whole list with their message appended,
+and both graphs end with the same messages. Figures are also reported
+per message of the final state.
+
+    python -m src.langgraph_mcp.benchmark_state [--requests 2000] [--history 10]
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, TypedDict
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.graph import END, StateGraph
+from typing_extensions import NotRequired
+
+from src.langgraph_mcp.state import GraphState
+
+RESULT = "result " * 200
+
+class LegacyState(TypedDict):
+    messages: List[BaseMessage]
+    current_mcp_server: NotRequired[str]
+    tool_outputs: List[str]
+
+# Without reducers, legacy nodes rebuild the lists they extend
+async def legacy_route(state: LegacyState) -> Dict[str, Any]:
+    return {"current_mcp_server": "brave-search", "tool_outputs": []}
+
+async def legacy_execute(state: LegacyState) -> Dict[str, Any]:
+    return {
+        "messages": state["messages"] + [AIMessage(content=RESULT)],
+        "tool_outputs": state["tool_outputs"] + [RESULT]
+    }
+
+async def route(state: GraphState) -> Dict[str, Any]:
+    return {"query": state.messages[-1].content, "route": "brave-search"}
+
+async def execute(state: GraphState) -> Dict[str, Any]:
+    return {"messages": [AIMessage(content=RESULT)], "tool_results": [RESULT], "cacheable": True}
+
+def build(schema: type, route_node: Callable, execute_node: Callable,
+          routed: Callable[[Any], bool]):
+    workflow = StateGraph(schema)
+    workflow.add_node("route_request", route_node)
+    workflow.add_node("execute_tool", execute_node)
+    workflow.add_conditional_edges(
+        "route_request", lambda state: "execute_tool" if routed(state) else END,
+        {"execute_tool": "execute_tool", END: END}
+    )
+    workflow.add_edge("execute_tool", END)
+    workflow.set_entry_point("route_request")
+    return workflow.compile()
+
+async def measure(name: str, graph, initial: Callable[[], Dict[str, Any]], requests: int) -> None:
+    serializer = JsonPlusSerializer()
+    for _ in range(min(requests, 50)):
+        await graph.ainvoke(initial())
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        await graph.ainvoke(initial())
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = await graph.ainvoke(initial())
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename") if stat.size_diff > 0)
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        payload = serializer.dumps_typed(result)
+    serialize = time.perf_counter() - started
+
+    messages = len(result["messages"])
+    print(f"{name:8} {elapsed / requests * 1e6:9.1f} us/request ({elapsed / requests / messages * 1e6:6.1f}/msg)  "
+          f"{allocated / 1024:8.1f} KiB / {blocks:6d} blocks allocated  "
+          f"{messages:3d} messages  {len(payload[1]):7d} B serialized ({len(payload[1]) // messages:5d}/msg)  "
+          f"{serialize / requests * 1e6:8.1f} us to serialize")
+
+async def main(requests: int, history: int) -> None:
+    # Earlier conversation turns carried in the request, as a checkpointed thread would
+    turns: List[BaseMessage] = []
+    for index in range(history):
+        turns += [HumanMessage(content=f"question {index}"), AIMessage(content=RESULT)]
+
+    legacy = build(LegacyState, legacy_route, legacy_execute,
+                   lambda state: bool(state.get("current_mcp_server")))
+    current = build(GraphState, route, execute, lambda state: bool(state.route))
+
+    await measure("legacy", legacy, lambda: {
+        "messages": turns + [HumanMessage(content="search for langgraph")],
+        "current_mcp_server": None,
+        "tool_outputs": []
+    }, requests)
+    await measure("current", current, lambda: {
+        "messages": turns + [HumanMessage(content="search for langgraph")]
+    }, requests)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--history", type=int, default=10,
+                        help="Earlier turns in the message list")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.history))
@@ -0,0 +1,329 @@
+"""
+Warm browser context pool for the puppeteer MCP server.
+
+The puppeteer server drives a single browser page per process, so each
+pooled context is one warm puppeteer server session with its own browser.
+Requests lease a context exclusively, which isolates their page state;
+the page is reset to about:blank when the lease is returned. The number
+of contexts caps concurrent pages, and contexts are replaced after a
+configurable number of leases to bound browser memory growth. Leases
+are granted by priority class and tenant; `reserved_interactive` pages
+(none by default) are kept for interactive requests.
+
+A shared network-transport puppeteer server has one page for the whole
+node, so for it the pool keeps a single context and every lease also
+holds a node-wide file lock: one request at a time drives the page
+across all worker processes.
+
+Read-only page fetches (navigate and extract text) are served from a
+short-TTL navigation cache keyed by URL.
+"""
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from src.langgraph_mcp.deadline import within_deadline
+from src.langgraph_mcp.mcp_wrapper import MultiplexedSession, is_network_server
+from src.langgraph_mcp.metrics import metrics
+from src.langgraph_mcp.prompt_renderer import prompt_renderer
+from src.langgraph_mcp.scheduler import FairScheduler
+
+try:
+    import fcntl
+except ImportError:
+    # No multi-worker mode without Unix, so there is nothing to lock across
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+PAGE_TEXT_SCRIPT = "document.title + '\\n\\n' + document.body.innerText"
+
+class BrowserContext:
+    def __init__(self, server_name: str, server_config: Dict[str, Any]):
+        # One call at a time: a context is a single page
+        self.session = MultiplexedSession(server_name, server_config, max_in_flight=1)
+        self.leases = 0
+        # Root pids of this context's server process tree, for resource recycling
+        self.pids: set = set()
+
+    async def start(self) -> None:
+        await self.session.start()
+
+    async def reset(self) -> None:
+        await self.session.call_tool("puppeteer_navigate", url="about:blank")
+
+    async def close(self) -> None:
+        await self.session.close()
+
+class NodeLock:
+    """Exclusive lock shared by every process on the node, backed by flock"""
+
+    def __init__(self, name: str, poll_interval: float = 0.05):
+        self.path = os.path.join(tempfile.gettempdir(), f"langgraph_mcp_{name}.lock")
+        self.poll_interval = poll_interval
+        self._fd: Optional[int] = None
+
+    async def acquire(self) -> None:
+        if fcntl is None:
+            return
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    await asyncio.sleep(self.poll_interval)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+
+    def release(self) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+class BrowserContextPool:
+    def __init__(self, server_name: str = "puppeteer", max_pages: int = 2,
+                 max_leases_per_context: int = 50, navigation_ttl: float = 60.0,
+                 navigation_cache_size: int = 128):
+        self.server_name = server_name
+        self.max_pages = max_pages
+        self.max_leases_per_context = max_leases_per_context
+        self.navigation_ttl = navigation_ttl
+        self.navigation_cache_size = navigation_cache_size
+        self._server_config: Optional[Dict[str, Any]] = None
+        self._fingerprint: Optional[str] = None
+        self._idle: List[BrowserContext] = []
+        self._contexts: List[BrowserContext] = []
+        self._available: Optional[asyncio.Condition] = None
+        self._start_lock: Optional[asyncio.Lock] = None
+        self._node_lock: Optional[NodeLock] = None
+        self._scheduler = FairScheduler(f"browser:{server_name}", max_pages)
+        self._navigations: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    def _condition(self) -> asyncio.Condition:
+        if self._available is None:
+            self._available = asyncio.Condition()
+        return self._available
+
+    def configure(self, server_config: Dict[str, Any]) -> None:
+        """Use `server_config` for new contexts; a changed config retires existing ones"""
+        fingerprint = prompt_renderer.fingerprint(server_config)
+        if fingerprint == self._fingerprint:
+            return
+        if self._fingerprint is not None:
+            asyncio.create_task(self.close())
+        self._server_config = server_config
+        self._fingerprint = fingerprint
+        self.max_pages = server_config.get("max_pages", self.max_pages)
+        self._node_lock = None
+        if is_network_server(server_config):
+            # One shared browser page for the node: one lease at a time
+            self.max_pages = 1
+            self._node_lock = NodeLock(f"browser_{zlib.crc32(server_config['url'].encode()):08x}")
+        # Leases already granted are released to the scheduler they came from
+        self._scheduler = FairScheduler(
+            f"browser:{self.server_name}", self.max_pages,
+            reserved=server_config.get("reserved_interactive", 0)
+        )
+        self._navigations.clear()
+
+    async def warm(self, server_config: Dict[str, Any], contexts: int = 1) -> None:
+        """Start `contexts` browsers ahead of the first request"""
+        self.configure(server_config)
+        condition = self._condition()
+        async with condition:
+            missing = max(min(contexts, self.max_pages) - len(self._contexts), 0)
+            new = [self._reserve() for _ in range(missing)]
+        for index, context in enumerate(new):
+            try:
+                await self._start(context)
+            except Exception as e:
+                logger.warning(f"Browser pool warm-up failed: {e}")
+                async with condition:
+                    for unstarted in new[index + 1:]:
+                        self._contexts.remove(unstarted)
+                    condition.notify_all()
+                return
+            async with condition:
+                self._idle.append(context)
+                condition.notify()
+        logger.info(f"Browser pool warm with {len(self._idle)} contexts")
+
+    def _reserve(self) -> BrowserContext:
+        """Count a new context against max_pages before its browser starts"""
+        context = BrowserContext(self.server_name, self._server_config)
+        self._contexts.append(context)
+        return context
+
+    async def _start(self, context: BrowserContext) -> None:
+        # Imported here: the resource monitor imports this module to recycle browsers
+        from src.langgraph_mcp.resource_monitor import child_pids, cmdline, matches_server
+
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        try:
+            # One start at a time so the new browser process can be told apart
+            async with self._start_lock:
+                before = set(child_pids(os.getpid()))
+                await context.start()
+                context.pids = {
+                    pid for pid in set(child_pids(os.getpid())) - before
+                    if matches_server(cmdline(pid), self._server_config)
+                }
+        except Exception:
+            async with self._condition():
+                if context in self._contexts:
+                    self._contexts.remove(context)
+                self._condition().notify()
+            raise
+
+    @asynccontextmanager
+    async def lease(self, server_config: Dict[str, Any],
+                    timeout: Optional[float] = None) -> AsyncIterator[MultiplexedSession]:
+        """Exclusive use of one browser context for the duration of a request"""
+        self.configure(server_config)
+        scheduler, node_lock = self._scheduler, self._node_lock
+        await within_deadline("browser_lease", scheduler.acquire(), timeout=timeout)
+        try:
+            if node_lock is not None:
+                await within_deadline("browser_lease", node_lock.acquire(), timeout=timeout)
+            try:
+                context = await self._acquire_context(timeout)
+            except BaseException:
+                if node_lock is not None:
+                    node_lock.release()
+                raise
+        except BaseException:
+            scheduler.release()
+            raise
+        context.leases += 1
+
+        healthy = True
+        try:
+            yield context.session
+        except Exception:
+            healthy = not context.session.closed
+            raise
+        finally:
+            try:
+                # The page is reset while the node lock is still held
+                await self._release(context, healthy)
+            finally:
+                if node_lock is not None:
+                    node_lock.release()
+                scheduler.release()
+
+    async def _acquire_context(self, timeout: Optional[float]) -> BrowserContext:
+        condition = self._condition()
+        started = time.monotonic()
+        async with condition:
+            await within_deadline(
+                "browser_lease",
+                condition.wait_for(lambda: self._idle or len(self._contexts) < self.max_pages),
+                timeout=timeout
+            )
+            fresh = not self._idle
+            context = self._reserve() if fresh else self._idle.pop()
+        if fresh:
+            # Browsers start outside the lock so other leases are not held up
+            await self._start(context)
+        metrics.observe("browser_lease_wait_seconds", time.monotonic() - started)
+        return context
+
+    async def _release(self, context: BrowserContext, healthy: bool) -> None:
+        retire = (not healthy or context.session.closed
+                  or context not in self._contexts
+                  or context.leases >= self.max_leases_per_context)
+        if not retire:
+            try:
+                await context.reset()
+            except Exception as e:
+                logger.warning(f"Browser context reset failed, retiring it: {e}")
+                retire = True
+
+        condition = self._condition()
+        async with condition:
+            if retire:
+                if context in self._contexts:
+                    self._contexts.remove(context)
+                asyncio.create_task(context.close())
+            else:
+                self._idle.append(context)
+            condition.notify()
+
+    def owns(self, pid: int) -> bool:
+        return any(pid in context.pids for context in self._contexts)
+
+    async def recycle(self, pid: int) -> bool:
+        """Retire the context whose browser runs as `pid` and start a replacement.
+
+        An idle context is closed at once; a leased one is closed when its
+        lease ends, so the request using it finishes first.
+        """
+        condition = self._condition()
+        async with condition:
+            context = next((context for context in self._contexts if pid in context.pids), None)
+            if context is None:
+                return False
+            self._contexts.remove(context)
+            idle = context in self._idle
+            if idle:
+                self._idle.remove(context)
+            condition.notify_all()
+        if idle:
+            await context.close()
+        if self._server_config is not None:
+            asyncio.create_task(self.warm(self._server_config))
+        return True
+
+    async def fetch_page(self, url: str, server_config: Dict[str, Any]) -> str:
+        """Navigate to `url` and return its text, served from cache when fresh"""
+        cached = self._navigations.get(url)
+        if cached is not None and cached[0] > time.monotonic():
+            self._navigations.move_to_end(url)
+            metrics.increment("browser_navigation_cache_total", result="hit")
+            return cached[1]
+        metrics.increment("browser_navigation_cache_total", result="miss")
+
+        async with self.lease(server_config) as session:
+            await session.call_tool("puppeteer_navigate", url=url)
+            content = await session.call_tool("puppeteer_evaluate", script=PAGE_TEXT_SCRIPT)
+
+        text = _tool_text(content)
+        self._navigations[url] = (time.monotonic() + self.navigation_ttl, text)
+        while len(self._navigations) > self.navigation_cache_size:
+            self._navigations.popitem(last=False)
+        return text
+
+    async def close(self) -> None:
+        async with self._condition():
+            contexts, self._contexts, self._idle = self._contexts, [], []
+        await asyncio.gather(*(context.close() for context in contexts), return_exceptions=True)
+
+    async def apply_config_change(self, change) -> None:
+        """Config store listener: retire browsers when the server config changes"""
+        if self.server_name in change.removed:
+            await self.close()
+        elif self.server_name in change.changed:
+            self.configure(change.current.servers[self.server_name])
+
+def _tool_text(content: str) -> str:
+    """Join the text parts of a serialized tool result"""
+    try:
+        parts = json.loads(content)
+        return "\n".join(part.get("text", "") for part in parts if isinstance(part, dict))
+    except (ValueError, TypeError):
+        return content
+
+browser_pool = BrowserContextPool()
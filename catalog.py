@@ -0,0 +1,183 @@
+"""
+Persistent capability catalog for MCP servers.
+
+Learning what a server offers means starting it and calling list_tools,
+list_prompts and list_resources. The catalog stores that result on disk,
+keyed by the server command, args and package version, so startup only
+reads a JSON file. Missing or stale entries are refreshed lazily in the
+background; routing and tool binding read from the catalog without
+spawning anything.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+from mcp import ClientSession
+
+from src.langgraph_mcp import mcp_wrapper as mcp
+from src.langgraph_mcp.prompt_renderer import prompt_renderer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATALOG_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "langgraph_mcp", "catalog.json"
+)
+
+_PACKAGE_SPEC = re.compile(r"^(@[^/@\s]+/[^@\s]+|[^@\s-][^@\s]*)@([^@\s]+)$")
+
+@dataclass
+class CatalogEntry:
+    server_name: str
+    description: str
+    tools: List[Dict[str, Any]] = field(default_factory=list)
+    updated_at: float = 0.0
+
+class DescribeCapabilities(mcp.MCPSessionFunction):
+    """Collect the routing description and tool schemas in one session"""
+
+    async def __call__(self, server_name: str, session: ClientSession) -> CatalogEntry:
+        _, description = await mcp.RoutingDescription()(server_name, session)
+        tools = await mcp.GetTools()(server_name, session)
+        return CatalogEntry(server_name, description, tools, time.time())
+
+class CapabilityCatalog:
+    def __init__(self, path: str = DEFAULT_CATALOG_PATH, max_age: float = 24 * 3600):
+        self.path = path
+        self.max_age = max_age
+        self.version = 0
+        self._entries: Dict[str, CatalogEntry] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self._descriptions: Dict[tuple, Dict[str, str]] = {}
+
+    @staticmethod
+    def package_version(server_config: Dict[str, Any]) -> str:
+        """Version pinned in the config (`version`) or in an `pkg@x.y.z` arg"""
+        if server_config.get("version"):
+            return str(server_config["version"])
+        for arg in server_config.get("args") or []:
+            match = _PACKAGE_SPEC.match(str(arg))
+            if match:
+                return match.group(2)
+        return "unversioned"
+
+    @classmethod
+    def key(cls, server_config: Dict[str, Any]) -> str:
+        # Shared network servers may have no command, so where they live is part of the identity
+        identity = {
+            "command": server_config.get("command"),
+            "args": server_config.get("args") or [],
+            "version": cls.package_version(server_config),
+            "transport": server_config.get("transport", "stdio"),
+            "url": server_config.get("url"),
+        }
+        return hashlib.sha256(json.dumps(identity, sort_keys=True).encode()).hexdigest()[:24]
+
+    def load(self) -> int:
+        """Load the catalog file; returns the number of entries read"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            self._entries = {key: CatalogEntry(**entry) for key, entry in raw.items()}
+        except FileNotFoundError:
+            self._entries = {}
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable capability catalog {self.path}: {e}")
+            self._entries = {}
+        self._touch()
+        return len(self._entries)
+
+    def save(self) -> None:
+        """Write the catalog atomically"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({key: asdict(entry) for key, entry in self._entries.items()}, f)
+        os.replace(tmp_path, self.path)
+
+    def get(self, server_config: Dict[str, Any]) -> Optional[CatalogEntry]:
+        return self._entries.get(self.key(server_config))
+
+    def is_stale(self, entry: Optional[CatalogEntry]) -> bool:
+        return entry is None or time.time() - entry.updated_at > self.max_age
+
+    async def refresh(self, server_name: str, server_config: Dict[str, Any]) -> CatalogEntry:
+        """Query the server and store its capabilities (concurrent calls share one query)"""
+        key = self.key(server_config)
+        task = self._refreshing.get(key)
+        if task is None:
+            task = self._refreshing[key] = asyncio.create_task(
+                self._refresh(key, server_name, server_config)
+            )
+            task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _refresh(self, key: str, server_name: str, server_config: Dict[str, Any]) -> CatalogEntry:
+        entry = await mcp.apply(server_name, server_config, DescribeCapabilities())
+        self._entries[key] = entry
+        self._touch()
+        try:
+            self.save()
+        except OSError as e:
+            logger.warning(f"Could not persist capability catalog: {e}")
+        logger.info(f"Catalog refreshed for {server_name} ({len(entry.tools)} tools)")
+        return entry
+
+    def refresh_in_background(self, mcp_server_config: Dict[str, Any]) -> Optional[asyncio.Task]:
+        """Refresh missing or stale entries one server at a time"""
+        pending = [
+            (name, server_config)
+            for name, server_config in mcp_server_config.get("mcpServers", {}).items()
+            if self.is_stale(self.get(server_config))
+        ]
+        if not pending:
+            return None
+
+        async def run():
+            for name, server_config in pending:
+                try:
+                    await self.refresh(name, server_config)
+                except Exception as e:
+                    logger.warning(f"Catalog refresh failed for {name}: {e}")
+
+        return asyncio.create_task(run())
+
+    async def tools(self, server_name: str, server_config: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Tool schemas for binding; only queries the server when nothing is cached"""
+        entry = self.get(server_config)
+        if entry is None:
+            entry = await self.refresh(server_name, server_config)
+        elif self.is_stale(entry) and self.key(server_config) not in self._refreshing:
+            self.refresh_in_background({"mcpServers": {server_name: server_config}})
+        return entry.tools
+
+    def descriptions(self, mcp_server_config: Dict[str, Any]) -> Dict[str, str]:
+        """Cached server -> capability text for routing prompts.
+
+        The same dict object is returned until the catalog or config changes,
+        so prompt rendering keyed on it stays cached.
+        """
+        key = (prompt_renderer.fingerprint(mcp_server_config), self.version)
+        descriptions = self._descriptions.get(key)
+        if descriptions is None:
+            self._descriptions.clear()
+            descriptions = self._descriptions[key] = {
+                name: entry.description
+                for name, server_config in mcp_server_config.get("mcpServers", {}).items()
+                if (entry := self.get(server_config)) is not None and entry.description
+            }
+        return descriptions
+
+    async def apply_config_change(self, change) -> None:
+        """Config store listener: fetch capabilities for new or changed servers"""
+        self.refresh_in_background(change.current.config)
+
+    def _touch(self) -> None:
+        self.version += 1
+
+capability_catalog = CapabilityCatalog(os.getenv("MCP_CATALOG_PATH", DEFAULT_CATALOG_PATH))
@@ -18,6 +18,11 @@ class CleanupManager:
         self._processes[name] = process
         logger.debug(f"Registered process: {name}")
         
+    def unregister_process(self, name: str) -> None:
+        """Stop tracking a subprocess that has been cleaned up individually"""
+        if self._processes.pop(name, None) is not None:
+            logger.debug(f"Unregistered process: {name}")
+
     def register_transport(self, transport) -> None:
         """Register a transport for cleanup"""
         self._transports.add(transport)
@@ -0,0 +1,88 @@
+"""
+Request deduplication and coalescing at the graph entry point.
+
+Requests are keyed by thread, normalized query and configuration fingerprint.
+Concurrent duplicates attach to the in-flight execution instead of running
+the graph again, and completed answers are served from a short-TTL cache
+unless the caller passes `bypass_cache=True`.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from src.langgraph_mcp.router import normalize_query
+
+logger = logging.getLogger(__name__)
+
+class RequestCoalescer:
+    def __init__(self, ttl: float = 30.0, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._responses: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    @staticmethod
+    def key(query: str, config_fingerprint: str, thread_id: str = "") -> str:
+        return f"{thread_id}:{config_fingerprint}:{normalize_query(query)}"
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]],
+                  bypass_cache: bool = False,
+                  should_cache: Optional[Callable[[Any], bool]] = None) -> Any:
+        """Return the result for `key`, running `factory` at most once at a time.
+
+        With `bypass_cache` the cache and any in-flight execution are ignored
+        and a fresh result is computed (and then cached for later callers).
+        Results for which `should_cache` returns False are shared with
+        concurrent waiters but not cached.
+        """
+        if not bypass_cache:
+            cached = self._get_cached(key)
+            if cached is not None:
+                logger.debug(f"Response cache hit: {key}")
+                return cached[1]
+
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                logger.debug(f"Coalescing with in-flight request: {key}")
+                # Shield so one cancelled waiter does not cancel the shared run
+                return await asyncio.shield(inflight)
+
+        task = asyncio.create_task(factory())
+        if not bypass_cache:
+            self._inflight[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done, should_cache))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task,
+                should_cache: Optional[Callable[[Any], bool]] = None) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        if should_cache is None or should_cache(task.result()):
+            self._store(key, task.result())
+
+    def _get_cached(self, key: str):
+        entry = self._responses.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._responses[key]
+            return None
+        return entry
+
+    def _store(self, key: str, result: Any) -> None:
+        if self.ttl <= 0:
+            return
+        self._responses[key] = (time.monotonic() + self.ttl, result)
+        self._responses.move_to_end(key)
+        while len(self._responses) > self.max_entries:
+            self._responses.popitem(last=False)
+
+    def clear(self) -> None:
+        self._responses.clear()
+
+request_coalescer = RequestCoalescer(ttl=float(os.getenv("MCP_RESPONSE_CACHE_TTL", "30")))
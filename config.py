@@ -6,7 +6,8 @@ MCP_SERVER_CONFIG = {
             "command": "npm.cmd" if os.name == "nt" else "npm",
             "args": ["exec", "@modelcontextprotocol/server-filesystem", "--", "."],
             "description": "File system operations",
-            "env": {}
+            "env": {},
+            "native": True
         },
         "puppeteer": {
             "command": "npm.cmd" if os.name == "nt" else "npm",
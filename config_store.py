@@ -0,0 +1,159 @@
+"""
+Versioned MCP server configuration with hot reload.
+
+The active configuration is an immutable snapshot; every reload produces a new
+snapshot with a bumped version. A file watcher polls the configuration file and
+only the servers whose entries changed are restarted, so warm processes for
+unchanged servers survive a reload.
+"""
+import asyncio
+import copy
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from src.langgraph_mcp.config import MCP_SERVER_CONFIG
+from src.langgraph_mcp.prompt_renderer import prompt_renderer
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """Immutable view of the MCP server configuration at one version.
+
+    `config` has the same shape as `config.MCP_SERVER_CONFIG` and must not be
+    mutated; callers pin a snapshot for the lifetime of a request.
+    """
+    version: int
+    fingerprint: str
+    config: Dict[str, Any]
+
+    @property
+    def servers(self) -> Dict[str, Dict[str, Any]]:
+        return self.config.get("mcpServers", {})
+
+@dataclass(frozen=True)
+class ConfigChange:
+    previous: ConfigSnapshot
+    current: ConfigSnapshot
+    added: Set[str]
+    removed: Set[str]
+    changed: Set[str]
+
+ChangeListener = Callable[[ConfigChange], Awaitable[None]]
+
+def load_server_config(path: str) -> Dict[str, Any]:
+    """Load an MCP server configuration file (same shape as MCP_SERVER_CONFIG)"""
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    if not isinstance(config.get("mcpServers"), dict):
+        raise ValueError(f"Invalid MCP server config in {path}: missing 'mcpServers'")
+    return config
+
+class ConfigStore:
+    def __init__(self, config: Dict[str, Any]):
+        self._current = self._snapshot(config, version=1)
+        self._listeners: List[ChangeListener] = []
+        self._lock = asyncio.Lock()
+
+    @property
+    def current(self) -> ConfigSnapshot:
+        return self._current
+
+    def on_change(self, listener: ChangeListener) -> None:
+        """Register an async callback invoked after each effective reload"""
+        self._listeners.append(listener)
+
+    async def update(self, config: Dict[str, Any]) -> Optional[ConfigChange]:
+        """Install a new configuration; returns None if nothing changed"""
+        async with self._lock:
+            previous = self._current
+            snapshot = self._snapshot(config, version=previous.version + 1)
+            if snapshot.fingerprint == previous.fingerprint:
+                return None
+
+            old, new = previous.servers, snapshot.servers
+            change = ConfigChange(
+                previous=previous,
+                current=snapshot,
+                added=set(new) - set(old),
+                removed=set(old) - set(new),
+                changed={
+                    name for name in set(old) & set(new)
+                    if prompt_renderer.fingerprint(old[name]) != prompt_renderer.fingerprint(new[name])
+                },
+            )
+            self._current = snapshot
+            logger.info(
+                f"Config v{snapshot.version}: added={sorted(change.added)} "
+                f"removed={sorted(change.removed)} changed={sorted(change.changed)}"
+            )
+
+        for listener in list(self._listeners):
+            try:
+                await listener(change)
+            except Exception as e:
+                logger.error(f"Config change listener failed: {e}")
+        return change
+
+    @staticmethod
+    def _snapshot(config: Dict[str, Any], version: int) -> ConfigSnapshot:
+        config = copy.deepcopy(config)
+        return ConfigSnapshot(
+            version=version,
+            fingerprint=prompt_renderer.fingerprint(config),
+            config=config,
+        )
+
+class ConfigWatcher:
+    """Polls a configuration file and pushes changes into a ConfigStore"""
+
+    def __init__(self, store: ConfigStore, path: str, interval: float = 2.0):
+        self.store = store
+        self.path = path
+        self.interval = interval
+        self._mtime: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._mtime = self._stat()
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _stat(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            mtime = self._stat()
+            if mtime is None or mtime == self._mtime:
+                continue
+            self._mtime = mtime
+            try:
+                await self.store.update(load_server_config(self.path))
+            except Exception as e:
+                logger.error(f"Failed to reload config from {self.path}: {e}")
+
+def _initial_config() -> Dict[str, Any]:
+    path = os.getenv("MCP_SERVER_CONFIG_PATH")
+    if path and os.path.exists(path):
+        return load_server_config(path)
+    return MCP_SERVER_CONFIG
+
+config_store = ConfigStore(_initial_config())
@@ -2,14 +2,20 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field, fields
+from functools import lru_cache
 from typing import Annotated, Any, Optional, Type, TypeVar
 from langchain_core.runnables import RunnableConfig, ensure_config
 
 from langgraph_mcp import prompts
+from src.langgraph_mcp.prompt_renderer import prompt_renderer
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, frozen=True)
 class Configuration:
-    """Configuration class for MCP routing operations."""
+    """Configuration class for MCP routing operations.
+
+    Instances are immutable and shared: `from_runnable_config` returns the same
+    object for every call with an equivalent `configurable` dict.
+    """
 
     mcp_server_config: dict[str, Any] = field(
         default_factory=dict,
@@ -19,14 +25,77 @@ class Configuration:
     routing_model: Annotated[str, {"__template_metadata__": {"kind": "llm"}}] = field(
         default="gpt-4-0125-preview",
         metadata={
-            "description": "The language model used for router decisions."
+            "description": "The language model used for router decisions; tried first unless it misses the routing targets."
         },
     )
 
     execution_model: Annotated[str, {"__template_metadata__": {"kind": "llm"}}] = field(
         default="gpt-4-0125-preview",
         metadata={
-            "description": "The language model used for tool execution."
+            "description": "The language model used for tool execution; tried first unless it misses the execution targets."
+        },
+    )
+
+    routing_fallback_models: tuple[str, ...] = field(
+        default=("openai/gpt-4o-mini", "anthropic/claude-3-5-haiku-latest"),
+        metadata={
+            "description": "Further routing candidates; when the routing model misses the routing targets the selector picks the cheapest one that meets them, and falls back across them on errors."
+        },
+    )
+
+    execution_fallback_models: tuple[str, ...] = field(
+        default=("openai/gpt-4o", "anthropic/claude-3-5-sonnet-latest"),
+        metadata={
+            "description": "Further tool-execution candidates, selected and used for fallback like the routing ones."
+        },
+    )
+
+    routing_min_quality: int = field(
+        default=1,
+        metadata={
+            "description": "Minimum model quality tier for routing (1 small, 2 large)."
+        },
+    )
+
+    execution_min_quality: int = field(
+        default=2,
+        metadata={
+            "description": "Minimum model quality tier for tool execution (1 small, 2 large)."
+        },
+    )
+
+    routing_latency_target: float = field(
+        default=3.0,
+        metadata={
+            "description": "Target seconds per routing model call; slower models are avoided and calls past twice the target fall back."
+        },
+    )
+
+    execution_latency_target: float = field(
+        default=30.0,
+        metadata={
+            "description": "Target seconds per tool-execution model turn."
+        },
+    )
+
+    routing_confidence_threshold: float = field(
+        default=0.6,
+        metadata={
+            "description": "Minimum keyword-classifier confidence below which the router falls back to the routing model."
+        },
+    )
+
+    max_tool_iterations: int = field(
+        default=5,
+        metadata={
+            "description": "Maximum number of model turns in the tool-calling loop."
+        },
+    )
+
+    tool_loop_timeout: float = field(
+        default=120.0,
+        metadata={
+            "description": "Wall-clock budget in seconds for the tool-calling loop."
         },
     )
 
@@ -62,17 +131,42 @@ class Configuration:
     def from_runnable_config(
         cls: Type[T], config: Optional[RunnableConfig] = None
     ) -> T:
-        """Create a Configuration instance from a RunnableConfig object."""
+        """Create a Configuration instance from a RunnableConfig object.
+
+        Parsed instances are cached per configuration fingerprint, so repeated
+        node calls within and across requests reuse one snapshot.
+        """
         config = ensure_config(config)
         configurable = config.get("configurable") or {}
-        _fields = {f.name for f in fields(cls) if f.init}
-        return cls(**{k: v for k, v in configurable.items() if k in _fields})
+        _fields = _init_fields(cls)
+        values = {k: v for k, v in configurable.items() if k in _fields}
+        key = (cls, tuple(sorted((k, _freeze(v)) for k, v in values.items())))
+        instance = _CONFIGURATION_CACHE.get(key)
+        if instance is None:
+            if len(_CONFIGURATION_CACHE) >= _CONFIGURATION_CACHE_SIZE:
+                _CONFIGURATION_CACHE.clear()
+            instance = _CONFIGURATION_CACHE[key] = cls(**values)
+        return instance
     
     def get_mcp_server_descriptions(self) -> list[tuple[str, str]]:
         """Get a list of descriptions of the MCP servers."""
-        return [
-            (server_name, server_config['description']) 
-            for server_name, server_config in self.mcp_server_config["mcpServers"].items()
-        ]
+        return list(prompt_renderer.server_descriptions(self.mcp_server_config))
+
+T = TypeVar("T", bound=Configuration)
+
+_CONFIGURATION_CACHE: dict[tuple, Configuration] = {}
+_CONFIGURATION_CACHE_SIZE = 64
+
+@lru_cache(maxsize=None)
+def _init_fields(cls: type) -> frozenset[str]:
+    return frozenset(f.name for f in fields(cls) if f.init)
 
-T = TypeVar("T", bound=Configuration)
\ No newline at end of file
+def _freeze(value: Any) -> Any:
+    """Hashable stand-in for a configurable value, used as a cache key."""
+    if isinstance(value, (dict, list)):
+        return prompt_renderer.fingerprint(value)
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
\ No newline at end of file
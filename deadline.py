@@ -0,0 +1,106 @@
+"""
+End-to-end request deadlines.
+
+A Deadline is created at the entry point and travels with the request in
+two ways: as `configurable["deadline"]` in the graph config for nodes, and
+in a context variable for code below the graph (MCP sessions, LLM calls)
+that never sees the config. Each stage awaits its work through
+`Deadline.run`, which bounds it by the remaining budget, cancels it when
+the budget runs out and records how long the stage took.
+"""
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    def __init__(self, stage: str):
+        super().__init__(f"Deadline exceeded during {stage}")
+        self.stage = stage
+
+class Deadline:
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.started = time.monotonic()
+        self.expires = self.started + budget
+        self.stages: List[Tuple[str, float, float]] = []
+
+    def remaining(self) -> float:
+        return max(self.expires - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires
+
+    def check(self, stage: str) -> None:
+        """Raise DeadlineExceeded if no budget is left for `stage`"""
+        if self.expired:
+            raise DeadlineExceeded(stage)
+
+    def bound(self, timeout: Optional[float]) -> float:
+        """The smaller of `timeout` and the remaining budget"""
+        remaining = self.remaining()
+        return remaining if timeout is None else min(timeout, remaining)
+
+    async def run(self, stage: str, awaitable: Awaitable[Any],
+                  timeout: Optional[float] = None) -> Any:
+        """Await `awaitable` within the budget; it is cancelled on expiry.
+
+        Running out of the budget raises DeadlineExceeded; running past the
+        caller's own shorter `timeout` raises a plain asyncio.TimeoutError.
+        """
+        started = time.monotonic()
+        if self.expired:
+            if asyncio.iscoroutine(awaitable):
+                # Never awaited; close it to avoid a "never awaited" warning
+                awaitable.close()
+            self.stages.append((stage, started - self.started, 0.0))
+            raise DeadlineExceeded(stage)
+        remaining = self.remaining()
+        budget_bound = timeout is None or timeout >= remaining
+        try:
+            return await asyncio.wait_for(awaitable, remaining if budget_bound else timeout)
+        except asyncio.TimeoutError as e:
+            if isinstance(e, DeadlineExceeded) or not (budget_bound or self.expired):
+                raise
+            raise DeadlineExceeded(stage) from e
+        finally:
+            self.stages.append((stage, started - self.started, time.monotonic() - started))
+
+    def timings(self) -> Dict[str, Any]:
+        return {
+            "budget": self.budget,
+            "elapsed": round(time.monotonic() - self.started, 4),
+            "stages": [
+                {"stage": stage, "start": round(start, 4), "duration": round(duration, 4)}
+                for stage, start, duration in self.stages
+            ],
+        }
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+
+def set_deadline(deadline: Optional[Deadline]):
+    """Make `deadline` current for this task and the tasks it creates"""
+    return _current.set(deadline)
+
+def reset_deadline(token) -> None:
+    _current.reset(token)
+
+def get_deadline(config: Optional[Dict[str, Any]] = None) -> Optional[Deadline]:
+    """The request deadline from the graph config, else from the context"""
+    if config:
+        deadline = (config.get("configurable") or {}).get("deadline")
+        if deadline is not None:
+            return deadline
+    return _current.get()
+
+async def within_deadline(stage: str, awaitable: Awaitable[Any],
+                          config: Optional[Dict[str, Any]] = None,
+                          timeout: Optional[float] = None) -> Any:
+    """Await under the current request deadline, or plainly if there is none"""
+    deadline = get_deadline(config)
+    if deadline is None:
+        if timeout is None:
+            return await awaitable
+        return await asyncio.wait_for(awaitable, timeout)
+    return await deadline.run(stage, awaitable, timeout)
@@ -1,102 +1,399 @@
+import argparse
 import asyncio
 import os
 import sys
+import threading
 from datetime import datetime
-from typing import Dict, Any
+from functools import partial
+from typing import Awaitable, Callable, Dict, Any, List, Optional
 from langchain_core.messages import HumanMessage, AIMessage
 from src.langgraph_mcp.assistant_graph import graph
 from src.langgraph_mcp.server_manager import server_manager, manage_event_loop
-from src.langgraph_mcp.config import MCP_SERVER_CONFIG
+from src.langgraph_mcp.browser_pool import browser_pool
+from src.langgraph_mcp.catalog import capability_catalog
+from src.langgraph_mcp.coalescing import request_coalescer
+from src.langgraph_mcp.config_store import ConfigSnapshot, ConfigWatcher, config_store
+from src.langgraph_mcp.deadline import Deadline, DeadlineExceeded, reset_deadline, set_deadline
 from src.langgraph_mcp.logging_config import setup_logging
+from src.langgraph_mcp.mcp_wrapper import is_network_server, session_pool
+from src.langgraph_mcp.metrics import metrics
+from src.langgraph_mcp.profiling import request_profiler
+from src.langgraph_mcp.resource_monitor import resource_monitor
+from src.langgraph_mcp.scheduler import (
+    INTERACTIVE, PRIORITIES, request_scheduler, reset_request_class, set_request_class
+)
+from src.langgraph_mcp import traffic
+from src.langgraph_mcp.supervisor import Supervisor
 
 logger = setup_logging()
 
-async def start_mcp_server(name: str, config: Dict[str, Any]) -> asyncio.Task:
+async def start_mcp_server(name: str, config: Dict[str, Any]) -> Optional[asyncio.Task]:
     """Start and manage an MCP server process"""
     try:
-        # Prepare command and environment
-        cmd = [config["command"]] + config["args"]
-        env = {**os.environ, **config.get("env", {})}
-        
-        # Create and register the process
-        process = await server_manager.create_server_process(name, cmd, env)
-        
-        # Create and register server task
-        async def run_server():
-            try:
-                await process.wait()
-            finally:
-                if process.returncode is None:
-                    process.terminate()
-                    await process.wait()
-                    
-        return await server_manager.add_server(name, run_server())
-        
+        return await server_manager.start_server(name, config)
     except Exception as e:
         logger.error(f"Failed to start MCP server {name}: {e}")
         raise
 
-async def main():
+async def start_servers() -> List[asyncio.Task]:
+    """Start all configured MCP servers and enable config hot-reload"""
+    # Server capabilities come from the on-disk catalog; stale entries refresh lazily
+    entries = capability_catalog.load()
+    logger.info(f"Loaded {entries} capability catalog entries")
+    capability_catalog.refresh_in_background(config_store.current.config)
+
+    servers = []
+    for name, config in config_store.current.servers.items():
+        try:
+            server = await start_mcp_server(name, config)
+            if server is not None:
+                servers.append(server)
+        except Exception as e:
+            logger.error(f"Failed to start {name}: {e}")
+            raise
+
+    # Hot-reload server config; only changed servers are restarted
+    config_store.on_change(server_manager.apply_config_change)
+    config_store.on_change(session_pool.apply_config_change)
+    config_store.on_change(capability_catalog.apply_config_change)
+    config_path = os.getenv("MCP_SERVER_CONFIG_PATH")
+    if config_path:
+        ConfigWatcher(config_store, config_path).start()
+
+    # Keep a browser warm for puppeteer requests
+    config_store.on_change(browser_pool.apply_config_change)
+    puppeteer_config = config_store.current.servers.get("puppeteer")
+    if puppeteer_config and traffic.replay_log is None:
+        asyncio.create_task(browser_pool.warm(puppeteer_config))
+
+    # Watch server memory/CPU/FDs and recycle bloated servers
+    resource_monitor.start()
+    metrics_port = os.getenv("MCP_METRICS_PORT")
+    if metrics_port:
+        # Forked workers serve on consecutive ports: MCP_METRICS_PORT + worker index
+        await metrics.serve(int(metrics_port) + int(os.getenv("MCP_WORKER_INDEX", "0")))
+    return servers
+
+async def start_shared_servers() -> None:
+    """Start network-transport servers once for all worker processes"""
+    for name, config in config_store.current.servers.items():
+        if is_network_server(config) and not config.get("native"):
+            await start_mcp_server(name, config)
+
+ROUTING_MODEL = "openai/gpt-4-0125-preview"
+EXECUTION_MODEL = "openai/gpt-4-0125-preview"
+REQUEST_TIMEOUT = float(os.getenv("MCP_REQUEST_TIMEOUT", "120"))
+
+async def invoke_graph(user_input: str, thread_id: str, snapshot: ConfigSnapshot,
+                       profile: bool = False, timeout: Optional[float] = None) -> Dict[str, Any]:
+    """Run the graph for one request within its deadline.
+
+    The graph runs once the request scheduler admits the request; time in
+    the queue counts against the deadline. Returns the last assistant
+    message as `answer`. When the deadline runs out the graph is cancelled
+    and the answer is whatever the last completed step produced, with
+    `partial` set. `timings` breaks the request down by stage.
+    """
+    # Channels not given here start from their GraphState defaults
+    state = {"messages": [HumanMessage(content=user_input)]}
+    deadline = Deadline(timeout or REQUEST_TIMEOUT)
+    config = {
+        "configurable": {
+            "thread_id": thread_id,
+            "routing_model": ROUTING_MODEL,
+            "execution_model": EXECUTION_MODEL,
+            "mcp_server_config": snapshot.config,
+            "deadline": deadline
+        }
+    }
+    last_state = state
+
+    async def stream() -> None:
+        nonlocal last_state
+        async for values in graph.astream(state, config, stream_mode="values"):
+            last_state = values
+
+    token = set_deadline(deadline)
+    partial_answer = False
+    try:
+        await deadline.run("queue", request_scheduler.acquire())
+        try:
+            invocation = deadline.run("graph", stream())
+            if request_profiler.should_profile(profile):
+                request_id = f"{thread_id}-{datetime.now():%Y%m%d-%H%M%S-%f}"
+                await request_profiler.run(request_id, invocation)
+            else:
+                await invocation
+        finally:
+            request_scheduler.release()
+    except DeadlineExceeded as e:
+        logger.warning(f"Request deadline of {deadline.budget}s exceeded during {e.stage}")
+        partial_answer = True
+    finally:
+        reset_deadline(token)
+
+    ai_messages = [msg for msg in last_state["messages"]
+                 if isinstance(msg, AIMessage)]
+    return {
+        "answer": ai_messages[-1].content if ai_messages else None,
+        "partial": partial_answer,
+        "cacheable": not partial_answer and bool(last_state.get("cacheable")),
+        "timings": deadline.timings()
+    }
+
+async def handle_request(user_input: str, thread_id: str = "default",
+                         bypass_cache: bool = False, profile: bool = False,
+                         timeout: Optional[float] = None, tenant: str = "default",
+                         priority: str = INTERACTIVE) -> Dict[str, Any]:
+    """Run one user request through the graph.
+
+    Identical concurrent requests of a thread share one graph execution, and
+    recent answers from read-only routes are served from cache unless
+    `bypass_cache` is set; errors and side-effecting requests are never
+    cached. `profile`
+    writes a sampling profile and task timing report for the request
+    (requests are also sampled at MCP_PROFILE_SAMPLE_RATE). The request
+    must finish within `timeout` seconds (MCP_REQUEST_TIMEOUT by default);
+    past that it returns a partial answer, which is not cached. `tenant`
+    and `priority` place the request in the scheduler's fair queues and
+    follow it down to MCP session calls. Returns a
+    JSON-serializable dict with `answer`, `error`, `partial`, `timings` and
+    `elapsed` so the same handler can serve the local prompt and worker
+    processes.
+    """
+    start_time = datetime.now()
+    snapshot = config_store.current
+    key = request_coalescer.key(
+        user_input, f"{snapshot.fingerprint}:{ROUTING_MODEL}:{EXECUTION_MODEL}", thread_id
+    )
+    result, error = {}, None
+    # Set before the coalescer creates the graph task so the task inherits it
+    request_class = set_request_class(tenant, priority)
+    try:
+        result = await request_coalescer.run(
+            key,
+            lambda: invoke_graph(user_input, thread_id, snapshot, profile, timeout),
+            bypass_cache=bypass_cache,
+            should_cache=lambda result: result["cacheable"]
+        )
+    except Exception as e:
+        logger.error(f"Error processing request: {e}")
+        error = str(e)
+    finally:
+        reset_request_class(request_class)
+
+    elapsed = (datetime.now() - start_time).total_seconds()
+    if traffic.recorder is not None:
+        traffic.recorder.record(
+            "request", thread_id, "handle_request", {"input": user_input}, result.get("answer"),
+            traffic.recorder.offset() - elapsed, elapsed, error
+        )
+    return {
+        "answer": result.get("answer"),
+        "error": error,
+        "partial": result.get("partial", False),
+        "timings": result.get("timings"),
+        "elapsed": elapsed
+    }
+
+async def read_input(prompt: str) -> str:
+    """input() without blocking the event loop.
+
+    Runs in a daemon thread rather than the default executor, so an
+    interrupt at the prompt does not wait for a line before shutting down.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def settle(line: Optional[str], error: Optional[BaseException]) -> None:
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(line)
+
+    def read() -> None:
+        try:
+            line, error = input(prompt), None
+        except BaseException as e:
+            line, error = None, e
+        loop.call_soon_threadsafe(settle, line, error)
+
+    threading.Thread(target=read, name="prompt-input", daemon=True).start()
+    return await future
+
+async def prompt_loop(submit: Callable[[str, str], Awaitable[Dict[str, Any]]],
+                      thread_id: str = "default") -> None:
+    """Read requests from stdin and print the responses from `submit`.
+
+    The prompt waits off the event loop, so metrics, the resource monitor,
+    config watching and warm-ups keep running between requests.
+    """
+    while True:
+        try:
+            try:
+                user_input = (await read_input("\nEnter request (or 'exit' to quit): ")).strip()
+            except EOFError:
+                break
+            if user_input.lower() in ['exit', 'quit', 'q', '']:
+                break
+
+            response = await submit(user_input, thread_id)
+            if response.get("error"):
+                print(f"Error: {response['error']}")
+            elif response.get("answer"):
+                print(f"\nAssistant: {response['answer']}")
+            if response.get("partial"):
+                stages = ", ".join(
+                    f"{stage['stage']} {stage['duration']:.2f}s"
+                    for stage in response["timings"]["stages"]
+                )
+                print(f"\n(Partial answer: deadline exceeded. Stages: {stages})")
+
+            print(f"\nTime: {response['elapsed']:.2f}s")
+
+        except KeyboardInterrupt:
+            if sys.platform == "win32":
+                await server_manager.shutdown()
+            logger.info("Operation cancelled by user")
+            break
+        except Exception as e:
+            logger.error(f"Error in main loop: {e}", exc_info=True)
+
+async def main(bypass_cache: bool = False, profile: bool = False, tenant: str = "default",
+               priority: str = INTERACTIVE):
     async with manage_event_loop() as loop:
         try:
-            # Start MCP servers
-            servers = []
-            for name, config in MCP_SERVER_CONFIG["mcpServers"].items():
-                try:
-                    server = await start_mcp_server(name, config)
-                    servers.append(server)
-                except Exception as e:
-                    logger.error(f"Failed to start {name}: {e}")
-                    raise
-            
-            while True:
-                try:
-                    user_input = input("\nEnter request (or 'exit' to quit): ").strip()
-                    if user_input.lower() in ['exit', 'quit', 'q', '']:
-                        break
-                        
-                    state = {
-                        "messages": [HumanMessage(content=user_input)],
-                        "current_mcp_server": None,
-                        "tool_outputs": []
-                    }
-                    
-                    start_time = datetime.now()
-                    try:
-                        result = await graph.ainvoke(state, {
-                            "configurable": {
-                                "routing_model": "openai/gpt-4-0125-preview",
-                                "execution_model": "openai/gpt-4-0125-preview",
-                                "mcp_server_config": MCP_SERVER_CONFIG
-                            }
-                        })
-                        
-                        ai_messages = [msg for msg in result["messages"] 
-                                     if isinstance(msg, AIMessage)]
-                        if ai_messages:
-                            print(f"\nAssistant: {ai_messages[-1].content}")
-                    except Exception as e:
-                        logger.error(f"Error processing request: {e}")
-                        print(f"Error: {str(e)}")
-                        
-                    print(f"\nTime: {(datetime.now() - start_time).total_seconds():.2f}s")
-                    
-                except KeyboardInterrupt:
-                    if sys.platform == "win32":
-                        await server_manager.shutdown()
-                    logger.info("Operation cancelled by user")
-                    break
-                except Exception as e:
-                    logger.error(f"Error in main loop: {e}", exc_info=True)
-                    
+            await start_servers()
+            await prompt_loop(partial(
+                handle_request, bypass_cache=bypass_cache, profile=profile,
+                tenant=tenant, priority=priority
+            ))
         except Exception as e:
             logger.error(f"Fatal error: {e}", exc_info=True)
             raise
 
+async def load_test(concurrency: int, bypass_cache: bool = True, tenant: str = "default",
+                    priority: str = INTERACTIVE, workers: int = 1) -> None:
+    """Replay the recorded requests from MCP_REPLAY_PATH and report throughput.
+
+    The response cache is bypassed by default so repeated recorded requests
+    measure the graph rather than cache hits. With `workers` > 1 the
+    requests go through a Supervisor, each on its recorded thread id.
+    """
+    if traffic.replay_log is None:
+        raise RuntimeError("Load test mode requires MCP_REPLAY_PATH")
+    requests = traffic.replay_log.requests()
+    if not requests:
+        raise RuntimeError(f"No recorded requests in {traffic.replay_log.path}")
+    # Routing prompts are built from the catalog, as in start_servers
+    logger.info(f"Loaded {capability_catalog.load()} capability catalog entries")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    supervisor, submit = None, handle_request
+    if workers > 1:
+        supervisor = Supervisor(workers, handler=handle_request, startup=start_servers,
+                                shared_startup=start_shared_servers)
+        await supervisor.start()
+        submit = supervisor.submit
+
+    async def run(entry: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaphore:
+            return await submit(
+                entry["p"]["input"], entry["s"], bypass_cache=bypass_cache,
+                tenant=tenant, priority=priority
+            )
+
+    try:
+        started = datetime.now()
+        responses = await asyncio.gather(*(run(entry) for entry in requests))
+        total = (datetime.now() - started).total_seconds()
+    finally:
+        if supervisor is not None:
+            await supervisor.shutdown()
+
+    latencies = sorted(response["elapsed"] for response in responses)
+    errors = sum(1 for response in responses if response["error"])
+    print(f"Requests: {len(responses)}  errors: {errors}  concurrency: {concurrency}")
+    print(f"Throughput: {len(responses) / total:.2f} req/s over {total:.2f}s")
+    print(f"Latency p50: {latencies[len(latencies) // 2]:.3f}s  "
+          f"p95: {latencies[int(len(latencies) * 0.95)]:.3f}s  max: {latencies[-1]:.3f}s")
+
+async def supervise(workers: int, thread_id: str, bypass_cache: bool = False,
+                    profile: bool = False, tenant: str = "default",
+                    priority: str = INTERACTIVE, listen: Optional[str] = None) -> None:
+    """Multi-process mode: dispatch requests to `workers` worker processes.
+
+    Requests come from the prompt, or with `listen` from clients of a Unix
+    socket at that path, one conversation per connection.
+    """
+    supervisor = Supervisor(workers, handler=handle_request, startup=start_servers,
+                            shared_startup=start_shared_servers)
+    options = dict(bypass_cache=bypass_cache, profile=profile, tenant=tenant, priority=priority)
+    try:
+        await supervisor.start()
+        if listen:
+            await supervisor.serve(listen, **options)
+        else:
+            await prompt_loop(partial(supervisor.submit, **options), thread_id)
+    finally:
+        await supervisor.shutdown()
+        # Stops the shared servers once no worker uses them
+        await server_manager.shutdown()
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="LangGraph MCP assistant")
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv("MCP_WORKERS", "1")),
+        help="Number of worker processes (1 runs everything in this process)"
+    )
+    parser.add_argument(
+        "--thread-id", default="default",
+        help="Conversation thread id; requests of a thread stay on one worker"
+    )
+    parser.add_argument(
+        "--listen", metavar="PATH",
+        help="With --workers, serve NDJSON requests on a Unix socket instead of the prompt"
+    )
+    parser.add_argument(
+        "--load-test", type=int, metavar="CONCURRENCY",
+        help="Replay recorded requests from MCP_REPLAY_PATH and report throughput"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Bypass the response cache and request coalescing"
+    )
+    parser.add_argument(
+        "--with-cache", action="store_true",
+        help="Let --load-test use the response cache (bypassed by default)"
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="Profile every request (output in MCP_PROFILE_DIR)"
+    )
+    parser.add_argument(
+        "--tenant", default=os.getenv("MCP_TENANT", "default"),
+        help="Tenant for fair scheduling (weights in MCP_TENANT_WEIGHTS)"
+    )
+    parser.add_argument(
+        "--priority", choices=PRIORITIES, default=INTERACTIVE,
+        help="Scheduling class; batch requests never use the interactive reserve"
+    )
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
+    args = parse_args()
     try:
-        asyncio.run(main())
+        if args.load_test:
+            asyncio.run(load_test(args.load_test, not args.with_cache, args.tenant, args.priority,
+                                  args.workers))
+        elif args.workers > 1:
+            asyncio.run(supervise(args.workers, args.thread_id, args.no_cache, args.profile,
+                                  args.tenant, args.priority, args.listen))
+        else:
+            asyncio.run(main(args.no_cache, args.profile, args.tenant, args.priority))
     except KeyboardInterrupt:
         logger.info("Shutdown requested by user")
     except Exception as e:
-        logger.error(f"Startup error: {e}", exc_info=True)
\ No newline at end of file
+        logger.error(f"Startup error: {e}", exc_info=True)
@@ -1,11 +1,21 @@
+import asyncio
+import logging
 import os
 from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager, suppress
 from typing import Any
 from typing import Any
+from urllib.parse import urlsplit
 from langchain_core.tools import ToolException
 from mcp import ClientSession, ListPromptsResult, ListResourcesResult, ListToolsResult, StdioServerParameters, stdio_client
+from mcp.client.sse import sse_client
 import pydantic_core
+from src.langgraph_mcp import native_filesystem, traffic
+from src.langgraph_mcp.deadline import within_deadline
+from src.langgraph_mcp.prompt_renderer import prompt_renderer
+from src.langgraph_mcp.scheduler import FairScheduler
 
+logger = logging.getLogger(__name__)
 
 # Abstract base class for MCP session functions
 class MCPSessionFunction(ABC):
@@ -15,41 +25,35 @@ class MCPSessionFunction(ABC):
 
 class RoutingDescription(MCPSessionFunction):
     async def __call__(self, server_name: str, session: ClientSession) -> str:
-        tools: ListToolsResult | None = None
-        prompts: ListPromptsResult | None = None
-        resources: ListResourcesResult | None = None
-        content = ""
+        blocks = []
         try:
-            tools = await session.list_tools()
+            tools: ListToolsResult | None = await session.list_tools()
             if tools:
-                content += "Provides tools:\n"
-                for tool in tools.tools:
-                    content += f"- {tool.name}: {tool.description}\n"
-                content += "---\n"
+                blocks.append(prompt_renderer.capability_block(
+                    "tools", ((tool.name, tool.description) for tool in tools.tools)
+                ))
         except Exception as e:
             print(f"Failed to fetch tools from server '{server_name}': {e}")
         
         try:
-            prompts = await session.list_prompts()
+            prompts: ListPromptsResult | None = await session.list_prompts()
             if prompts:
-                content += "Provides prompts:\n"
-                for prompt in prompts.prompts:
-                    content += f"- {prompt.name}: {prompt.description}\n"
-                content += "---\n"
+                blocks.append(prompt_renderer.capability_block(
+                    "prompts", ((prompt.name, prompt.description) for prompt in prompts.prompts)
+                ))
         except Exception as e:
             print(f"Failed to fetch prompts from server '{server_name}': {e}")
 
         try:
-            resources = await session.list_resources()
+            resources: ListResourcesResult | None = await session.list_resources()
             if resources:
-                content += "Provides resources:\n"
-                for resource in resources.resources:
-                    content += f"- {resource.name}: {resource.description}\n"
-                content += "---\n"
+                blocks.append(prompt_renderer.capability_block(
+                    "resources", ((resource.name, resource.description) for resource in resources.resources)
+                ))
         except Exception as e:
             print(f"Failed to fetch resources from server '{server_name}': {e}")
 
-        return server_name, content
+        return server_name, "".join(blocks)
 
 class GetTools(MCPSessionFunction):
     async def __call__(self, server_name: str, session: ClientSession) -> list[dict[str, Any]]:
@@ -110,14 +114,273 @@ async def test_mcp_server(server_config):
         print(f"Error testing server: {e}")
         return False
 
-async def apply(server_name: str, server_config: dict, fn: MCPSessionFunction) -> Any:
+NETWORK_TRANSPORTS = ("sse", "streamable_http")
+
+def is_network_server(server_config: dict) -> bool:
+    """Whether the server is a long-lived process reached over a local socket"""
+    return server_config.get("transport", "stdio") in NETWORK_TRANSPORTS
+
+async def server_reachable(url: str, timeout: float = 1.0) -> bool:
+    """Whether something accepts connections at the host and port of `url`"""
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(parts.hostname, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    with suppress(OSError):
+        await writer.wait_closed()
+    return True
+
+@asynccontextmanager
+async def _streamable_http_client(url: str, headers: dict | None):
+    # Newer mcp releases only; imported here so stdio and SSE work without it
+    from mcp.client.streamable_http import streamablehttp_client
+    async with streamablehttp_client(url, headers=headers) as (read, write, _):
+        yield read, write
+
+def open_transport(server_name: str, server_config: dict):
+    """Return the client transport context manager for a server config.
+
+    `"transport": "sse"` or `"streamable_http"` with a `"url"` connects to a
+    shared server that other worker processes use as well; anything else
+    spawns the server as a stdio child of this process.
+    """
+    transport = server_config.get("transport", "stdio")
+    if transport == "sse":
+        return sse_client(server_config["url"], headers=server_config.get("headers"))
+    if transport == "streamable_http":
+        return _streamable_http_client(server_config["url"], server_config.get("headers"))
+    if transport != "stdio":
+        raise ValueError(f"Unknown transport {transport!r} for server '{server_name}'")
     server_params = StdioServerParameters(
         command=server_config["command"],
         args=server_config["args"],
         env={**os.environ, **(server_config.get("env") or {})}
     )
+    return stdio_client(server_params)
+
+def instrument(server_name: str, session: Any) -> Any:
+    """Wrap a session for traffic recording when MCP_RECORD_PATH is set"""
+    if traffic.recorder is None:
+        return session
+    return traffic.RecordingSession(server_name, session, traffic.recorder)
+
+class SessionClosed(ConnectionError):
+    """The session is draining or closed and takes no new calls"""
+
+class MultiplexedSession:
+    """A long-lived MCP session shared by many concurrent callers.
+
+    The transport and ClientSession are owned by a background task (their
+    async contexts must be entered and exited in the same task). Callers run
+    MCPSessionFunctions concurrently over the one connection; ClientSession
+    demultiplexes JSON-RPC responses by request id. Each call runs in its own
+    task so it can be cancelled or timed out without affecting the others,
+    and at most `max_in_flight` calls are outstanding at once. Calls are
+    admitted by priority class and tenant, with `reserved_interactive`
+    slots (a quarter by default) kept for interactive requests. Once the
+    session starts draining, new and still-queued calls fail with
+    SessionClosed.
+    """
+
+    def __init__(self, server_name: str, server_config: dict, max_in_flight: int = 16):
+        self.server_name = server_name
+        self.server_config = server_config
+        self.fingerprint = prompt_renderer.fingerprint(server_config)
+        self.in_flight = 0
+        self.requests_served = 0
+        self.draining = False
+        self._scheduler = FairScheduler(
+            f"mcp:{server_name}", max_in_flight,
+            reserved=server_config.get("reserved_interactive", max_in_flight // 4)
+        )
+        self._session: ClientSession | None = None
+        self._ready: asyncio.Future | None = None
+        self._closing = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._owner: asyncio.Task | None = None
+
+    @property
+    def closed(self) -> bool:
+        return self.draining or self._closing.is_set() or (
+            self._owner is not None and self._owner.done()
+        )
+
+    async def start(self) -> None:
+        if self._owner is None:
+            self._ready = asyncio.get_running_loop().create_future()
+            self._owner = asyncio.create_task(self._run())
+        elif self._ready.done():
+            # Already started (or failed): nothing to wait for or time
+            self._ready.result()
+            return
+        # Giving up on a slow start leaves the session starting for later callers
+        await within_deadline(f"mcp_start:{self.server_name}", asyncio.shield(self._ready))
+
+    async def _run(self) -> None:
+        try:
+            print(f"Starting session with (server: {self.server_name})")
+            async with open_transport(self.server_name, self.server_config) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    self._session = session
+                    self._ready.set_result(None)
+                    await self._closing.wait()
+        except Exception as e:
+            logger.error(f"Session for server '{self.server_name}' failed: {e}")
+            if not self._ready.done():
+                self._ready.set_exception(e)
+        finally:
+            self._session = None
+
+    def submit(self, fn: MCPSessionFunction) -> asyncio.Task:
+        """Schedule `fn` on this session; cancel the returned task to abort the call"""
+        return asyncio.create_task(self.apply(fn))
+
+    async def apply(self, fn: MCPSessionFunction, timeout: float | None = None) -> Any:
+        """Run `fn` on the session within `timeout` and the request deadline"""
+        if self.draining:
+            raise SessionClosed(f"Session for server '{self.server_name}' is draining")
+        await self.start()
+        return await within_deadline(f"mcp:{self.server_name}", self._apply(fn), timeout=timeout)
+
+    async def _apply(self, fn: MCPSessionFunction) -> Any:
+        async with self._scheduler.slot():
+            if self._session is None or self.draining:
+                raise SessionClosed(f"Session for server '{self.server_name}' is closed")
+            self.in_flight += 1
+            self._idle.clear()
+            try:
+                return await fn(self.server_name, instrument(self.server_name, self._session))
+            finally:
+                self.in_flight -= 1
+                self.requests_served += 1
+                if self.in_flight == 0:
+                    self._idle.set()
+
+    async def call_tool(self, tool_name: str, timeout: float | None = None, **kwargs) -> Any:
+        return await self.apply(RunTool(tool_name, **kwargs), timeout)
+
+    async def close(self, drain_timeout: float = 10.0) -> None:
+        """Stop accepting work, wait for in-flight calls, then close the connection"""
+        self.draining = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Closing '{self.server_name}' with {self.in_flight} calls in flight")
+        self._closing.set()
+        if self._owner is not None:
+            with suppress(asyncio.CancelledError):
+                await self._owner
+
+class SessionPool:
+    """One MultiplexedSession per server, recreated when it dies or its config changes.
+
+    For network servers the session is this process's pooled connection to
+    the shared server: a dropped connection is replaced on the next call,
+    retrying `reconnect_attempts` times with exponential backoff so workers
+    ride out a server restart.
+    """
+
+    def __init__(self):
+        self._sessions: dict[str, MultiplexedSession] = {}
+        self._lock = asyncio.Lock()
+
+    async def get(self, server_name: str, server_config: dict) -> MultiplexedSession:
+        attempts = server_config.get("reconnect_attempts", 3) if is_network_server(server_config) else 1
+        attempt = 1
+        while True:
+            try:
+                return await self._connect(server_name, server_config)
+            except asyncio.TimeoutError:
+                raise
+            except Exception as e:
+                if attempt >= attempts:
+                    raise
+                delay = min(0.5 * 2 ** (attempt - 1), 5.0)
+                logger.warning(f"Connecting to '{server_name}' failed ({e}), retrying in {delay:.1f}s")
+                await within_deadline(f"mcp_reconnect:{server_name}", asyncio.sleep(delay))
+                attempt += 1
+
+    async def _connect(self, server_name: str, server_config: dict) -> MultiplexedSession:
+        async with self._lock:
+            session = self._sessions.get(server_name)
+            if session is not None and (
+                session.closed or session.fingerprint != prompt_renderer.fingerprint(server_config)
+            ):
+                asyncio.create_task(session.close())
+                session = None
+            if session is None:
+                session = MultiplexedSession(
+                    server_name, server_config, server_config.get("max_in_flight", 16)
+                )
+                self._sessions[server_name] = session
+        try:
+            await session.start()
+        except Exception:
+            async with self._lock:
+                if self._sessions.get(server_name) is session:
+                    del self._sessions[server_name]
+            raise
+        return session
+
+    def sessions(self) -> dict[str, MultiplexedSession]:
+        return dict(self._sessions)
+
+    async def apply(self, server_name: str, server_config: dict, fn: MCPSessionFunction) -> Any:
+        session = await self.get(server_name, server_config)
+        try:
+            return await session.apply(fn)
+        except SessionClosed:
+            # Recycled or replaced while the call waited: run it on a fresh session
+            session = await self.get(server_name, server_config)
+            return await session.apply(fn)
+
+    async def close(self, server_name: str) -> None:
+        async with self._lock:
+            session = self._sessions.pop(server_name, None)
+        if session is not None:
+            await session.close()
+
+    async def close_all(self) -> None:
+        async with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        await asyncio.gather(*(session.close() for session in sessions), return_exceptions=True)
+
+    async def apply_config_change(self, change) -> None:
+        """Config store listener: drop sessions of removed or changed servers"""
+        for server_name in change.removed | change.changed:
+            await self.close(server_name)
+
+session_pool = SessionPool()
+
+async def apply(server_name: str, server_config: dict, fn: MCPSessionFunction,
+                pooled: bool = True) -> Any:
+    """Run `fn` against a server session.
+
+    By default the call goes through the shared, multiplexed session pool;
+    `pooled=False` (or `"pooled": false` in the server config) starts a
+    dedicated server process for this call only. Servers with `"native": true`
+    run in-process and never spawn a process. Every path is bounded by the
+    current request deadline, if any.
+    """
+    stage = f"mcp:{server_name}"
+    if traffic.replay_log is not None:
+        return await within_deadline(
+            stage, fn(server_name, traffic.ReplaySession(server_name, traffic.replay_log))
+        )
+    if server_config.get("native"):
+        return await within_deadline(
+            stage, fn(server_name, instrument(server_name, native_filesystem.get_session(server_config)))
+        )
+    if pooled and server_config.get("pooled", True):
+        return await session_pool.apply(server_name, server_config, fn)
     print(f"Starting session with (server: {server_name})")
-    async with stdio_client(server_params) as (read, write):
+    async with open_transport(server_name, server_config) as (read, write):
         async with ClientSession(read, write) as session:
-            await session.initialize()
-            return await fn(server_name, session)
\ No newline at end of file
+            await within_deadline(f"mcp_start:{server_name}", session.initialize())
+            return await within_deadline(stage, fn(server_name, instrument(server_name, session)))
\ No newline at end of file
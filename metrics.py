@@ -0,0 +1,122 @@
+"""
+In-process metrics registry.
+
+Gauges, counters and summaries keyed by name and labels. The registry can
+be read as a dict snapshot or rendered in the Prometheus text format, and
+served over HTTP when MCP_METRICS_PORT is set. In multi-worker mode each
+worker serves its own registry on MCP_METRICS_PORT + worker index.
+"""
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+@dataclass
+class Summary:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._gauges: Dict[str, Dict[Labels, float]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._summaries: Dict[str, Dict[Labels, Summary]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @staticmethod
+    def _labels(labels: Dict[str, object]) -> Labels:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def gauge(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self._gauges.setdefault(name, {})[self._labels(labels)] = value
+
+    def increment(self, name: str, value: float = 1, **labels) -> None:
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = self._labels(labels)
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            series = self._summaries.setdefault(name, {})
+            series.setdefault(self._labels(labels), Summary()).observe(value)
+
+    def remove(self, name: str, **labels) -> None:
+        """Drop a gauge series, e.g. for a server that no longer exists"""
+        with self._lock:
+            self._gauges.get(name, {}).pop(self._labels(labels), None)
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        with self._lock:
+            return {
+                "gauges": {name: {labels: value for labels, value in series.items()}
+                           for name, series in self._gauges.items()},
+                "counters": {name: dict(series) for name, series in self._counters.items()},
+                "summaries": {name: {labels: vars(summary).copy() for labels, summary in series.items()}
+                              for name, series in self._summaries.items()},
+            }
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        def fmt(name: str, labels: Labels, value: float) -> str:
+            if labels:
+                rendered = ",".join(f'{key}="{val}"' for key, val in labels)
+                return f"{name}{{{rendered}}} {value}"
+            return f"{name} {value}"
+
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._gauges.items()):
+                lines.append(f"# TYPE {name} gauge")
+                lines.extend(fmt(name, labels, value) for labels, value in series.items())
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                lines.extend(fmt(name, labels, value) for labels, value in series.items())
+            for name, series in sorted(self._summaries.items()):
+                lines.append(f"# TYPE {name} summary")
+                for labels, summary in series.items():
+                    lines.append(fmt(f"{name}_count", labels, summary.count))
+                    lines.append(fmt(f"{name}_sum", labels, summary.total))
+                    lines.append(fmt(f"{name}_max", labels, summary.max))
+        return "\n".join(lines) + "\n"
+
+    async def serve(self, port: int, host: str = "127.0.0.1") -> None:
+        """Serve `render()` to any HTTP GET on host:port"""
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            try:
+                # Read and discard the request head
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                body = self.render().encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                    + f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+                    + body
+                )
+                await writer.drain()
+            finally:
+                writer.close()
+
+        self._server = await asyncio.start_server(handle, host, port)
+        logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+metrics = Metrics()
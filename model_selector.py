@@ -0,0 +1,293 @@
+"""
+Latency- and cost-aware model selection with cross-provider fallback.
+
+Each model-calling step has three inputs:
+- a candidate list: the configured `<step>_model` followed by the
+  `<step>_fallback_models`;
+- a minimum quality tier;
+- a latency target.
+
+Steps are currently "routing" and "execution".
+
+The selector keeps running (EWMA) latency and token statistics per step
+and model. Each call goes to the configured `<step>_model` as long as it
+meets the quality tier, is not cooling down and its recent latency is
+within the target. Otherwise it goes to the cheapest candidate that
+meets those targets. The target is reduced to what is left of the
+request deadline. When no candidate is fast enough, the fastest one is
+used. Models without recent samples count as fast, so a model that was
+slow earlier gets tried again later. A candidate is only considered when
+its provider has credentials and its LangChain integration is installed.
+
+Fallback: a call that errors, or runs past `slow_factor` times the
+target, moves on to the next candidate, which may be on another
+provider. A model that fails `max_failures` times in a row is skipped
+for a cool-down period.
+
+Decisions, fallbacks, latencies, tokens and estimated cost are exported
+as metrics. Under traffic replay, candidates are tried in configured
+order, so a replay finds the models that were recorded.
+"""
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+
+from src.langgraph_mcp import traffic
+from src.langgraph_mcp.deadline import get_deadline, within_deadline
+from src.langgraph_mcp.metrics import metrics
+from src.langgraph_mcp.utils import load_chat_model
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class ModelProfile:
+    quality: int
+    input_price: float  # USD per million tokens
+    output_price: float
+
+# Quality tiers: 1 for small fast models, 2 for large tool-calling models
+MODEL_PROFILES: Dict[str, ModelProfile] = {
+    "openai/gpt-4o-mini": ModelProfile(1, 0.15, 0.60),
+    "openai/gpt-4o": ModelProfile(2, 2.50, 10.00),
+    "openai/gpt-4-0125-preview": ModelProfile(2, 10.00, 30.00),
+    "anthropic/claude-3-5-haiku-latest": ModelProfile(1, 0.80, 4.00),
+    "anthropic/claude-3-5-sonnet-latest": ModelProfile(2, 3.00, 15.00),
+}
+
+# Unlisted models are assumed capable but are only preferred when nothing cheaper qualifies
+UNKNOWN_PROFILE = ModelProfile(2, 100.0, 100.0)
+
+_PROVIDER_KEYS = {"openai": "OPENAI_API_KEY", "anthropic": "ANTHROPIC_API_KEY"}
+_PROVIDER_PACKAGES = {"openai": "langchain_openai", "anthropic": "langchain_anthropic"}
+
+@lru_cache(maxsize=None)
+def _installed(package: str) -> bool:
+    return importlib.util.find_spec(package) is not None
+
+def qualified(model_string: str) -> str:
+    """`provider/model`, defaulting to OpenAI like load_chat_model"""
+    return model_string if "/" in model_string else f"openai/{model_string}"
+
+@dataclass
+class ModelStats:
+    latency: Optional[float] = None
+    input_tokens: Optional[float] = None
+    output_tokens: Optional[float] = None
+    updated: float = 0.0
+
+    def record(self, alpha: float, latency: float, input_tokens: Optional[int] = None,
+               output_tokens: Optional[int] = None) -> None:
+        def ewma(current: Optional[float], sample: Optional[float]) -> Optional[float]:
+            if sample is None:
+                return current
+            return sample if current is None else current + alpha * (sample - current)
+
+        self.latency = ewma(self.latency, latency)
+        self.input_tokens = ewma(self.input_tokens, input_tokens)
+        self.output_tokens = ewma(self.output_tokens, output_tokens)
+        self.updated = time.monotonic()
+
+@dataclass
+class ModelHealth:
+    failures: int = 0
+    cooldown_until: float = 0.0
+
+class ModelSelector:
+    def __init__(self, profiles: Optional[Dict[str, ModelProfile]] = None, alpha: float = 0.2,
+                 slow_factor: float = 2.0, max_failures: int = 3, cooldown: float = 30.0,
+                 stale_after: float = 300.0):
+        self.profiles = profiles if profiles is not None else MODEL_PROFILES
+        self.alpha = alpha
+        self.slow_factor = slow_factor
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.stale_after = stale_after
+        self._models: Dict[str, BaseChatModel] = {}
+        self._stats: Dict[Tuple[str, str], ModelStats] = {}
+        self._health: Dict[str, ModelHealth] = {}
+
+    def profile(self, model_name: str) -> ModelProfile:
+        return self.profiles.get(model_name, UNKNOWN_PROFILE)
+
+    def available(self, model_name: str) -> bool:
+        """Whether the provider package is installed and has credentials
+        (always true under replay)"""
+        if traffic.replay_log is not None:
+            return True
+        provider = model_name.split("/", 1)[0]
+        package = _PROVIDER_PACKAGES.get(provider)
+        if package is not None and not _installed(package):
+            return False
+        key = _PROVIDER_KEYS.get(provider)
+        return key is None or bool(os.getenv(key))
+
+    def candidates(self, step: str, configuration: Any) -> List[str]:
+        models = (getattr(configuration, f"{step}_model"),
+                  *getattr(configuration, f"{step}_fallback_models"))
+        return list(dict.fromkeys(qualified(model) for model in models))
+
+    def _latency(self, step: str, model_name: str) -> Optional[float]:
+        stats = self._stats.get((step, model_name))
+        if stats is None or time.monotonic() - stats.updated > self.stale_after:
+            return None
+        return stats.latency
+
+    def expected_cost(self, step: str, model_name: str) -> float:
+        """Estimated USD per call from the step's observed token counts"""
+        stats = self._stats.get((step, model_name)) or ModelStats()
+        profile = self.profile(model_name)
+        input_tokens = stats.input_tokens if stats.input_tokens is not None else 1000
+        output_tokens = stats.output_tokens if stats.output_tokens is not None else 200
+        return (input_tokens * profile.input_price + output_tokens * profile.output_price) / 1e6
+
+    def rank(self, step: str, models: Sequence[str], min_quality: int,
+             latency_target: float) -> List[Tuple[str, str]]:
+        """(model, reason) pairs in the order the models should be tried.
+
+        `models[0]` is the configured model and stays first while it meets
+        the targets.
+        """
+        usable = [model for model in models if self.available(model)]
+        if not usable:
+            raise RuntimeError(f"No usable model (package and credentials) for the {step} step: {list(models)}")
+        qualifying = [model for model in usable if self.profile(model).quality >= min_quality]
+        if not qualifying:
+            logger.warning(f"No {step} model meets quality tier {min_quality}, using any available")
+            qualifying = usable
+        if traffic.replay_log is not None:
+            return [(model, "configured") for model in qualifying]
+
+        now = time.monotonic()
+        healthy = [model for model in qualifying
+                   if self._health.get(model, ModelHealth()).cooldown_until <= now]
+        cooling = [model for model in qualifying if model not in healthy]
+
+        def within_target(model: str) -> bool:
+            latency = self._latency(step, model)
+            return latency is None or latency <= latency_target
+
+        fast = sorted((model for model in healthy if within_target(model)),
+                      key=lambda model: self.expected_cost(step, model))
+        slow = sorted((model for model in healthy if not within_target(model)),
+                      key=lambda model: self._latency(step, model))
+        configured = []
+        if models and models[0] in fast:
+            fast.remove(models[0])
+            configured = [(models[0], "configured")]
+        # Cooling-down models stay as a last resort
+        return (configured + [(model, "cheapest") for model in fast]
+                + [(model, "fastest") for model in slow] + [(model, "cooldown") for model in cooling])
+
+    def _model(self, model_name: str) -> BaseChatModel:
+        model = self._models.get(model_name)
+        if model is None:
+            model = self._models[model_name] = load_chat_model(model_name)
+        return model
+
+    async def ainvoke(self, step: str, configuration: Any, messages: List[BaseMessage],
+                      tools: Optional[List[Dict[str, Any]]] = None,
+                      timeout: Optional[float] = None) -> BaseMessage:
+        """Invoke the best model for `step`, falling back on errors and slowdowns.
+
+        `timeout` bounds the whole step including fallbacks. The request
+        deadline is honoured as well; running out of it is never treated as
+        a reason to fall back.
+        """
+        latency_target = getattr(configuration, f"{step}_latency_target")
+        deadline = get_deadline()
+        if deadline is not None:
+            latency_target = min(latency_target, deadline.remaining())
+        ranked = self.rank(step, self.candidates(step, configuration),
+                           getattr(configuration, f"{step}_min_quality"), latency_target)
+
+        loop = asyncio.get_running_loop()
+        ends = None if timeout is None else loop.time() + timeout
+        last_error: Optional[BaseException] = None
+        for index, (model_name, reason) in enumerate(ranked):
+            attempt_timeout = None if index == len(ranked) - 1 else latency_target * self.slow_factor
+            if ends is not None:
+                remaining = ends - loop.time()
+                if remaining <= 0:
+                    break
+                attempt_timeout = remaining if attempt_timeout is None else min(attempt_timeout, remaining)
+
+            metrics.increment("model_selection_total", step=step, model=model_name,
+                              reason=reason if index == 0 else "fallback")
+            model = self._model(model_name)
+            if tools is not None:
+                model = model.bind_tools(tools)
+            started = time.monotonic()
+            try:
+                response = await within_deadline(
+                    f"{step}_llm", model.ainvoke(messages), timeout=attempt_timeout
+                )
+            except asyncio.TimeoutError as e:
+                if deadline is not None and deadline.expired:
+                    raise
+                logger.warning(f"{step} model {model_name} too slow, falling back")
+                self._failed(step, model_name, "slow", time.monotonic() - started)
+                last_error = e
+                continue
+            except Exception as e:
+                logger.warning(f"{step} model {model_name} failed, falling back: {e}")
+                self._failed(step, model_name, "error")
+                last_error = e
+                continue
+            self._succeeded(step, model_name, time.monotonic() - started, response)
+            return response
+
+        raise last_error or asyncio.TimeoutError(f"No time left for the {step} step")
+
+    def _failed(self, step: str, model_name: str, reason: str,
+                latency: Optional[float] = None) -> None:
+        metrics.increment("model_fallback_total", step=step, model=model_name, reason=reason)
+        if latency is not None:
+            # A lower bound, but enough to stop preferring the model
+            self._stats.setdefault((step, model_name), ModelStats()).record(self.alpha, latency)
+        health = self._health.setdefault(model_name, ModelHealth())
+        health.failures += 1
+        if health.failures >= self.max_failures:
+            health.cooldown_until = time.monotonic() + self.cooldown
+            metrics.gauge("model_cooldown", 1, model=model_name)
+
+    def _succeeded(self, step: str, model_name: str, latency: float,
+                   response: BaseMessage) -> None:
+        usage = getattr(response, "usage_metadata", None) or {}
+        input_tokens, output_tokens = usage.get("input_tokens"), usage.get("output_tokens")
+        stats = self._stats.setdefault((step, model_name), ModelStats())
+        stats.record(self.alpha, latency, input_tokens, output_tokens)
+        self._health[model_name] = ModelHealth()
+        metrics.gauge("model_cooldown", 0, model=model_name)
+
+        metrics.observe("model_latency_seconds", latency, step=step, model=model_name)
+        metrics.gauge("model_latency_ewma_seconds", stats.latency, step=step, model=model_name)
+        if input_tokens is not None and output_tokens is not None:
+            profile = self.profile(model_name)
+            metrics.increment("model_tokens_total", input_tokens, model=model_name, kind="input")
+            metrics.increment("model_tokens_total", output_tokens, model=model_name, kind="output")
+            metrics.increment(
+                "model_cost_usd_total",
+                (input_tokens * profile.input_price + output_tokens * profile.output_price) / 1e6,
+                model=model_name
+            )
+
+def _profiles_from_env() -> Dict[str, ModelProfile]:
+    """MODEL_PROFILES updated from MCP_MODEL_PROFILES, a JSON object of
+    model -> {"quality", "input_price", "output_price"}"""
+    profiles = dict(MODEL_PROFILES)
+    overrides = os.getenv("MCP_MODEL_PROFILES")
+    if overrides:
+        for model_name, profile in json.loads(overrides).items():
+            profiles[qualified(model_name)] = ModelProfile(**profile)
+    return profiles
+
+model_selector = ModelSelector(profiles=_profiles_from_env())
@@ -0,0 +1,264 @@
+"""
+In-process filesystem MCP backend.
+
+Implements the tool interface of `@modelcontextprotocol/server-filesystem`
+directly in Python so filesystem calls do not spawn a Node process. The
+session object exposes the subset of `ClientSession` used by
+`MCPSessionFunction`s (list_tools, call_tool, list_prompts, list_resources),
+so `mcp_wrapper.apply` can hand it to any session function unchanged.
+
+All paths are sandboxed to the allowed roots, directory listings are cached
+by directory mtime, and large files are read through a memory map.
+
+Handlers do blocking filesystem work, so `call_tool` runs them in a worker
+thread. The listing cache is only touched on the event loop: directory
+listing stats and scans in a thread and updates the cache on its return.
+"""
+import asyncio
+import codecs
+import fnmatch
+import mmap
+import os
+import stat
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from mcp.types import (
+    CallToolResult,
+    ListPromptsResult,
+    ListResourcesResult,
+    ListToolsResult,
+    TextContent,
+    Tool,
+)
+
+MMAP_THRESHOLD = 64 * 1024
+
+def _path_schema(**extra: Dict[str, Any]) -> Dict[str, Any]:
+    properties = {"path": {"type": "string"}, **extra}
+    return {"type": "object", "properties": properties, "required": list(properties)}
+
+TOOLS = [
+    Tool(
+        name="read_file",
+        description="Read the complete contents of a file. Only works within allowed directories.",
+        inputSchema=_path_schema(),
+    ),
+    Tool(
+        name="read_multiple_files",
+        description="Read the contents of multiple files at once. Failed reads are reported per file.",
+        inputSchema={
+            "type": "object",
+            "properties": {"paths": {"type": "array", "items": {"type": "string"}}},
+            "required": ["paths"],
+        },
+    ),
+    Tool(
+        name="write_file",
+        description="Create a new file or overwrite an existing file with new content.",
+        inputSchema=_path_schema(content={"type": "string"}),
+    ),
+    Tool(
+        name="create_directory",
+        description="Create a directory, including missing parents. Succeeds if it already exists.",
+        inputSchema=_path_schema(),
+    ),
+    Tool(
+        name="list_directory",
+        description="List files and directories in a path, prefixed with [FILE] or [DIR].",
+        inputSchema=_path_schema(),
+    ),
+    Tool(
+        name="search_files",
+        description="Recursively search for files and directories whose name matches a pattern.",
+        inputSchema=_path_schema(pattern={"type": "string"}),
+    ),
+    Tool(
+        name="get_file_info",
+        description="Retrieve metadata about a file or directory: size, times, type and permissions.",
+        inputSchema=_path_schema(),
+    ),
+    Tool(
+        name="list_allowed_directories",
+        description="Returns the list of directories this server is allowed to access.",
+        inputSchema={"type": "object", "properties": {}, "required": []},
+    ),
+]
+
+class NativeFilesystemSession:
+    def __init__(self, allowed_directories: List[str], listing_cache_size: int = 256):
+        self.allowed_directories = [os.path.realpath(os.path.expanduser(d)) for d in allowed_directories]
+        self.listing_cache_size = listing_cache_size
+        self._listings: "OrderedDict[str, Tuple[int, str]]" = OrderedDict()
+        self._handlers: Dict[str, Callable[..., Union[str, Awaitable[str]]]] = {
+            "read_file": self.read_file,
+            "read_multiple_files": self.read_multiple_files,
+            "write_file": self.write_file,
+            "create_directory": self.create_directory,
+            "list_directory": self.list_directory,
+            "search_files": self.search_files,
+            "get_file_info": self.get_file_info,
+            "list_allowed_directories": self.list_allowed_directories,
+        }
+
+    # ClientSession-compatible surface
+
+    async def initialize(self) -> None:
+        pass
+
+    async def list_tools(self) -> ListToolsResult:
+        return ListToolsResult(tools=TOOLS)
+
+    async def list_prompts(self) -> ListPromptsResult:
+        return ListPromptsResult(prompts=[])
+
+    async def list_resources(self) -> ListResourcesResult:
+        return ListResourcesResult(resources=[])
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None) -> CallToolResult:
+        handler = self._handlers.get(name)
+        try:
+            if handler is None:
+                raise ValueError(f"Unknown tool: {name}")
+            if asyncio.iscoroutinefunction(handler):
+                text = await handler(**(arguments or {}))
+            else:
+                text = await asyncio.to_thread(handler, **(arguments or {}))
+            is_error = False
+        except Exception as e:
+            text, is_error = f"Error: {e}", True
+        return CallToolResult(content=[TextContent(type="text", text=text)], isError=is_error)
+
+    # Sandboxing
+
+    def _within_roots(self, real_path: str) -> bool:
+        return any(
+            real_path == root or real_path.startswith(root.rstrip(os.sep) + os.sep)
+            for root in self.allowed_directories
+        )
+
+    def validate_path(self, path: str) -> str:
+        """Resolve `path` (following symlinks) and ensure it is inside an allowed root.
+
+        realpath also resolves dangling symlinks and paths that do not exist
+        yet, so a new file is checked where it would actually be created.
+        """
+        real_path = os.path.realpath(os.path.abspath(os.path.expanduser(path)))
+        if not self._within_roots(real_path):
+            raise PermissionError(f"Access denied - path outside allowed directories: {path}")
+        return real_path
+
+    # Tools
+
+    def read_file(self, path: str) -> str:
+        return self._read(self.validate_path(path))
+
+    def read_multiple_files(self, paths: List[str]) -> str:
+        results = []
+        for path in paths:
+            try:
+                results.append(f"{path}:\n{self.read_file(path)}\n")
+            except Exception as e:
+                results.append(f"{path}: Error - {e}")
+        return "\n---\n".join(results)
+
+    def write_file(self, path: str, content: str) -> str:
+        real_path = self.validate_path(path)
+        # Never follow a symlink swapped in after validation
+        fd = os.open(real_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_NOFOLLOW", 0), 0o666)
+        with open(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        return f"Successfully wrote to {path}"
+
+    def create_directory(self, path: str) -> str:
+        os.makedirs(self.validate_path(path), exist_ok=True)
+        return f"Successfully created directory {path}"
+
+    async def list_directory(self, path: str) -> str:
+        real_path, mtime = await asyncio.to_thread(self._stat_directory, path)
+        cached = self._listings.get(real_path)
+        if cached is not None and cached[0] == mtime:
+            self._listings.move_to_end(real_path)
+            return cached[1]
+
+        listing = await asyncio.to_thread(self._scan_directory, real_path)
+        self._listings[real_path] = (mtime, listing)
+        if len(self._listings) > self.listing_cache_size:
+            self._listings.popitem(last=False)
+        return listing
+
+    def _stat_directory(self, path: str) -> Tuple[str, int]:
+        real_path = self.validate_path(path)
+        return real_path, os.stat(real_path).st_mtime_ns
+
+    @staticmethod
+    def _scan_directory(real_path: str) -> str:
+        with os.scandir(real_path) as entries:
+            return "\n".join(
+                f"{'[DIR]' if entry.is_dir() else '[FILE]'} {entry.name}"
+                for entry in sorted(entries, key=lambda e: e.name)
+            )
+
+    def search_files(self, path: str, pattern: str) -> str:
+        root = self.validate_path(path)
+        pattern = pattern.lower()
+        glob = any(c in pattern for c in "*?[")
+        matches = []
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        name = entry.name.lower()
+                        if (fnmatch.fnmatch(name, pattern) if glob else pattern in name):
+                            matches.append(entry.path)
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+            except PermissionError:
+                continue
+        return "\n".join(sorted(matches)) if matches else "No matches found"
+
+    def get_file_info(self, path: str) -> str:
+        st = os.stat(self.validate_path(path))
+        info = {
+            "size": st.st_size,
+            "created": datetime.fromtimestamp(st.st_ctime).isoformat(),
+            "modified": datetime.fromtimestamp(st.st_mtime).isoformat(),
+            "accessed": datetime.fromtimestamp(st.st_atime).isoformat(),
+            "isDirectory": stat.S_ISDIR(st.st_mode),
+            "isFile": stat.S_ISREG(st.st_mode),
+            "permissions": oct(st.st_mode & 0o777)[2:],
+        }
+        return "\n".join(f"{key}: {value}" for key, value in info.items())
+
+    def list_allowed_directories(self) -> str:
+        return "Allowed directories:\n" + "\n".join(self.allowed_directories)
+
+    @staticmethod
+    def _read(real_path: str) -> str:
+        with open(real_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < MMAP_THRESHOLD:
+                return f.read().decode("utf-8", errors="replace")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                with memoryview(mapped) as view:
+                    return codecs.decode(view, "utf-8", "replace")
+
+_sessions: Dict[Tuple[str, ...], NativeFilesystemSession] = {}
+
+def allowed_directories(server_config: Dict[str, Any]) -> List[str]:
+    """Allowed roots from a filesystem server config (the args after `--`)"""
+    args = list(server_config.get("args") or [])
+    if "--" in args:
+        args = args[args.index("--") + 1:]
+    return args or ["."]
+
+def get_session(server_config: Dict[str, Any]) -> NativeFilesystemSession:
+    """Shared in-process session for a filesystem server config"""
+    roots = tuple(allowed_directories(server_config))
+    session = _sessions.get(roots)
+    if session is None:
+        session = _sessions[roots] = NativeFilesystemSession(list(roots))
+    return session
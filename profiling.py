@@ -0,0 +1,223 @@
+"""
+On-demand per-request profiling.
+
+A profiled request runs under two collectors:
+- a sampling profiler that periodically captures the event-loop thread's
+  Python stack and writes folded stacks (`frame;frame;frame count`), the
+  input format of flamegraph.pl, speedscope and similar tools
+- an asyncio task timer that wraps every task created while profiling and
+  splits each coroutine's lifetime into CPU time, time running on the loop
+  without CPU (blocking calls that stall the event loop) and time spent
+  waiting on awaits
+
+Profiling is requested per request or sampled at MCP_PROFILE_SAMPLE_RATE;
+output goes to MCP_PROFILE_DIR.
+"""
+import asyncio
+import collections.abc
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_UNSAFE_NAME = re.compile(r"[^\w.-]")
+
+class SamplingProfiler:
+    """Samples one thread's stack at a fixed interval into folded stacks"""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                # Leave the task timer's wrapper frames out of the flamegraph
+                if code.co_filename != __file__:
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+@dataclass
+class CoroutineTiming:
+    tasks: int = 0
+    steps: int = 0
+    cpu: float = 0.0
+    running: float = 0.0
+    lifetime: float = 0.0
+    max_step: float = 0.0
+
+    @property
+    def blocked(self) -> float:
+        """Time on the loop thread without CPU: blocking I/O or sleeps in the loop"""
+        return max(self.running - self.cpu, 0.0)
+
+    @property
+    def waiting(self) -> float:
+        """Time suspended on awaits"""
+        return max(self.lifetime - self.running, 0.0)
+
+class _TimedCoroutine(collections.abc.Coroutine):
+    """Coroutine wrapper that measures every step the event loop runs"""
+
+    __slots__ = ("_coro", "_timing", "_created")
+
+    def __init__(self, coro, timing: CoroutineTiming):
+        self._coro = coro
+        self._timing = timing
+        self._created = time.perf_counter()
+        timing.tasks += 1
+
+    def send(self, value):
+        return self._step(self._coro.send, value)
+
+    def throw(self, *args):
+        return self._step(self._coro.throw, *args)
+
+    def close(self):
+        return self._coro.close()
+
+    def __await__(self):
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.send(None)
+
+    def _step(self, method, *args):
+        timing = self._timing
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            return method(*args)
+        except BaseException:
+            # StopIteration included: the coroutine finished
+            timing.lifetime += time.perf_counter() - self._created
+            raise
+        finally:
+            elapsed = time.perf_counter() - wall
+            timing.steps += 1
+            timing.cpu += time.thread_time() - cpu
+            timing.running += elapsed
+            timing.max_step = max(timing.max_step, elapsed)
+
+class TaskTimer:
+    """Installs a task factory that times every task created on the loop"""
+
+    def __init__(self):
+        self.timings: Dict[str, CoroutineTiming] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._previous_factory = None
+
+    def install(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._previous_factory = loop.get_task_factory()
+        loop.set_task_factory(self._factory)
+
+    def uninstall(self) -> None:
+        if self._loop is not None:
+            self._loop.set_task_factory(self._previous_factory)
+            self._loop = None
+
+    def wrap(self, coro) -> "_TimedCoroutine":
+        name = getattr(coro, "__qualname__", type(coro).__name__)
+        timing = self.timings.setdefault(name, CoroutineTiming())
+        return _TimedCoroutine(coro, timing)
+
+    def _factory(self, loop, coro, **kwargs):
+        coro = self.wrap(coro)
+        if self._previous_factory is not None:
+            return self._previous_factory(loop, coro, **kwargs)
+        return asyncio.Task(coro, loop=loop, **kwargs)
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {**asdict(timing), "blocked": timing.blocked, "waiting": timing.waiting}
+            for name, timing in sorted(
+                self.timings.items(), key=lambda item: item[1].running, reverse=True
+            )
+        }
+
+class RequestProfiler:
+    def __init__(self, output_dir: str = "profiles", sample_rate: float = 0.0,
+                 interval: float = 0.005):
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self._active = False
+
+    def should_profile(self, requested: bool = False) -> bool:
+        return requested or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    async def run(self, request_id: str, coro: Awaitable[Any]) -> Any:
+        """Await `coro` under the profilers and write the reports.
+
+        Collectors are process-wide, so only one request is profiled at a
+        time; concurrent requests are timed along with it if they create
+        tasks during the window.
+        """
+        if self._active:
+            logger.debug(f"Profiler busy, running {request_id} unprofiled")
+            return await coro
+
+        self._active = True
+        loop = asyncio.get_running_loop()
+        sampler = SamplingProfiler(threading.get_ident(), self.interval)
+        timer = TaskTimer()
+        timer.install(loop)
+        sampler.start()
+        started = time.perf_counter()
+        try:
+            # Run as a task so the request's own coroutine is timed as well
+            return await asyncio.ensure_future(coro)
+        finally:
+            sampler.stop()
+            timer.uninstall()
+            self._active = False
+            self._write(request_id, time.perf_counter() - started, sampler, timer)
+
+    def _write(self, request_id: str, elapsed: float, sampler: SamplingProfiler,
+               timer: TaskTimer) -> None:
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            # Request ids carry client-supplied thread ids: keep them inside output_dir
+            base = os.path.join(self.output_dir, _UNSAFE_NAME.sub("_", request_id))
+            with open(f"{base}.folded", "w", encoding="utf-8") as f:
+                f.write(sampler.folded())
+            with open(f"{base}.tasks.json", "w", encoding="utf-8") as f:
+                json.dump({"elapsed": elapsed, "coroutines": timer.report()}, f, indent=2)
+            logger.info(f"Profile for {request_id} written to {base}.folded / .tasks.json")
+        except OSError as e:
+            logger.error(f"Failed to write profile for {request_id}: {e}")
+
+request_profiler = RequestProfiler(
+    output_dir=os.getenv("MCP_PROFILE_DIR", "profiles"),
+    sample_rate=float(os.getenv("MCP_PROFILE_SAMPLE_RATE", "0")),
+)
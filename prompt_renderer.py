@@ -0,0 +1,154 @@
+"""
+Precompiled prompt rendering for the LangGraph MCP system.
+
+Static prompt parts (system prompts, tool description blocks, serialized tool
+schemas) are rendered once per config/catalog fingerprint. Per request only
+the dynamic fields are interpolated, and they are always placed after the
+static prefix so provider-side prompt caching sees an identical prefix.
+"""
+import hashlib
+import json
+from dataclasses import dataclass
+from string import Formatter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+@dataclass(frozen=True)
+class RenderedPrompt:
+    """A prompt split into a cache-stable prefix and a per-request suffix"""
+    prefix: str
+    suffix: str
+
+    @property
+    def text(self) -> str:
+        return self.prefix + self.suffix
+
+class PromptRenderer:
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._cache: Dict[Tuple, Any] = {}
+        self._fingerprints: Dict[int, Tuple[Any, str]] = {}
+
+    def fingerprint(self, obj: Any) -> str:
+        """Stable content hash of a JSON-like object.
+
+        Hashes are memoized by object identity (the object is pinned so its id
+        cannot be reused), so config and catalog objects must be treated as
+        immutable once rendered.
+        """
+        entry = self._fingerprints.get(id(obj))
+        if entry is not None and entry[0] is obj:
+            return entry[1]
+        digest = hashlib.sha256(
+            json.dumps(obj, sort_keys=True, default=str).encode()
+        ).hexdigest()[:16]
+        if len(self._fingerprints) >= self.max_entries:
+            self._fingerprints.clear()
+        self._fingerprints[id(obj)] = (obj, digest)
+        return digest
+
+    def _cached(self, key: Tuple, build) -> Any:
+        value = self._cache.get(key)
+        if value is None:
+            if len(self._cache) >= self.max_entries:
+                self._cache.clear()
+            value = self._cache[key] = build()
+        return value
+
+    def server_descriptions(self, mcp_server_config: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+        """(name, description) pairs for every configured server"""
+        key = ("servers", self.fingerprint(mcp_server_config))
+        return self._cached(key, lambda: tuple(
+            (name, server_config.get("description", ""))
+            for name, server_config in mcp_server_config.get("mcpServers", {}).items()
+        ))
+
+    def tool_descriptions(self, mcp_server_config: Dict[str, Any],
+                          capabilities: Optional[Dict[str, str]] = None) -> str:
+        """Bullet list of servers used to fill `{tool_descriptions}`.
+
+        `capabilities` maps server names to catalog text (tools, prompts,
+        resources), which is indented under the server's bullet.
+        """
+        capabilities = capabilities or {}
+        key = ("tool_descriptions", self.fingerprint(mcp_server_config), self.fingerprint(capabilities))
+
+        def build() -> str:
+            lines = []
+            for name, description in self.server_descriptions(mcp_server_config):
+                lines.append(f"- {name}: {description}")
+                lines.extend(f"  {line}" for line in capabilities.get(name, "").splitlines())
+            return "\n".join(lines)
+
+        return self._cached(key, build)
+
+    def router_system_prompt(self, template: str, mcp_server_config: Dict[str, Any],
+                             capabilities: Optional[Dict[str, str]] = None) -> str:
+        """Fully rendered router system prompt (it has no per-request fields)"""
+        capabilities = capabilities or {}
+        key = ("router", template, self.fingerprint(mcp_server_config), self.fingerprint(capabilities))
+        return self._cached(key, lambda: template.format(
+            tool_descriptions=self.tool_descriptions(mcp_server_config, capabilities)
+        ))
+
+    def tool_schemas(self, tools: Sequence[Dict[str, Any]]) -> Tuple[Dict[str, Any], ...]:
+        """OpenAI-style function schemas for a tool catalog, built once per catalog"""
+        key = ("schemas", self.fingerprint(tools))
+        return self._cached(key, lambda: tuple(
+            {
+                'type': 'function',
+                'function': {
+                    'name': tool['function'].get('name', ''),
+                    'description': tool['function'].get('description', ''),
+                    'parameters': tool['function'].get('parameters') or {'type': 'object', 'properties': {}}
+                }
+            }
+            for tool in tools
+            if isinstance(tool, dict) and 'function' in tool
+        ))
+
+    def render(self, template: str, static: Optional[Dict[str, Any]] = None,
+               **dynamic: Any) -> RenderedPrompt:
+        """Render a template, caching everything up to the first dynamic field.
+
+        `static` values are part of the cache key and must be stable across
+        requests; `dynamic` values are interpolated on every call.
+        """
+        static = static or {}
+        key = ("template", template, self.fingerprint(static), tuple(sorted(dynamic)))
+        prefix, suffix_template = self._cached(
+            key, lambda: self._split(template, static, dynamic.keys())
+        )
+        return RenderedPrompt(prefix, suffix_template.format(**static, **dynamic))
+
+    @staticmethod
+    def _split(template: str, static: Dict[str, Any], dynamic: Iterable[str]) -> Tuple[str, str]:
+        dynamic = set(dynamic)
+        prefix_parts: List[str] = []
+        suffix_parts: List[str] = []
+        parts = prefix_parts
+        for literal, field_name, format_spec, conversion in Formatter().parse(template):
+            parts.append(literal.replace("{", "{{").replace("}", "}}"))
+            if field_name is None:
+                continue
+            if parts is prefix_parts and field_name in dynamic:
+                parts = suffix_parts
+            parts.append(_field_source(field_name, format_spec, conversion))
+        return "".join(prefix_parts).format(**static), "".join(suffix_parts)
+
+    def capability_block(self, heading: str, items: Iterable[Tuple[str, Optional[str]]]) -> str:
+        """Render a "Provides X:" block as used in routing descriptions"""
+        lines = [f"Provides {heading}:"]
+        lines.extend(f"- {name}: {description}" for name, description in items)
+        lines.append("---")
+        return "\n".join(lines) + "\n"
+
+def _field_source(field_name: str, format_spec: str, conversion: Optional[str]) -> str:
+    """Reconstruct the `{...}` source text of a parsed format field"""
+    source = field_name
+    if conversion:
+        source += f"!{conversion}"
+    if format_spec:
+        source += f":{format_spec}"
+    return "{" + source + "}"
+
+prompt_renderer = PromptRenderer()
@@ -0,0 +1,240 @@
+"""
+Per-server resource monitoring and recycling.
+
+Samples RSS, CPU and open file descriptors for every MCP server process
+tree from /proc. Trees are attributed to servers either as processes
+started by ServerManager or, for pooled sessions, by matching the child
+process command line against the server config; puppeteer trees owned
+by a browser pool context are recycled through the browser pool. Samples
+are published as metrics, and a server is drained and recycled once it
+crosses its memory or request-count threshold.
+
+Thresholds come from the server config (`max_rss_mb`, `max_requests`)
+or the MCP_MAX_SERVER_RSS_MB / MCP_MAX_SERVER_REQUESTS environment
+variables. Monitoring is a no-op on systems without /proc.
+"""
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from src.langgraph_mcp.browser_pool import browser_pool
+from src.langgraph_mcp.config_store import config_store
+from src.langgraph_mcp.mcp_wrapper import session_pool
+from src.langgraph_mcp.metrics import metrics
+from src.langgraph_mcp.server_manager import server_manager
+
+logger = logging.getLogger(__name__)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+@dataclass
+class ProcessTreeStats:
+    processes: int = 0
+    rss_bytes: int = 0
+    cpu_seconds: float = 0.0
+    open_fds: int = 0
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path, "r") as f:
+            return f.read()
+    except (FileNotFoundError, ProcessLookupError, PermissionError):
+        return None
+
+def child_pids(pid: int) -> List[int]:
+    children: List[int] = []
+    try:
+        tasks = os.listdir(f"/proc/{pid}/task")
+    except (FileNotFoundError, PermissionError):
+        return children
+    for tid in tasks:
+        content = _read(f"/proc/{pid}/task/{tid}/children")
+        if content:
+            children.extend(int(child) for child in content.split())
+    return children
+
+def process_tree(pid: int) -> List[int]:
+    pids, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        pids.append(current)
+        stack.extend(child_pids(current))
+    return pids
+
+def cmdline(pid: int) -> List[str]:
+    content = _read(f"/proc/{pid}/cmdline")
+    return [part for part in content.split("\0") if part] if content else []
+
+def sample_tree(pid: int) -> ProcessTreeStats:
+    stats = ProcessTreeStats()
+    for member in process_tree(pid):
+        statm = _read(f"/proc/{member}/statm")
+        stat = _read(f"/proc/{member}/stat")
+        if statm is None or stat is None:
+            continue
+        stats.processes += 1
+        stats.rss_bytes += int(statm.split()[1]) * _PAGE_SIZE
+        # Fields after the parenthesized command name; utime and stime are 14 and 15
+        fields = stat[stat.rindex(")") + 2:].split()
+        stats.cpu_seconds += (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+        try:
+            stats.open_fds += len(os.listdir(f"/proc/{member}/fd"))
+        except (FileNotFoundError, PermissionError):
+            pass
+    return stats
+
+def matches_server(command_line: List[str], server_config: Dict[str, Any]) -> bool:
+    args = [str(arg) for arg in server_config.get("args") or []]
+    if not args:
+        return False
+    joined = " ".join(command_line)
+    return " ".join(args) in joined and os.path.basename(server_config["command"]).split(".")[0] in joined
+
+class ResourceMonitor:
+    def __init__(self, interval: float = 15.0, max_rss_mb: Optional[float] = None,
+                 max_requests: Optional[int] = None):
+        self.interval = interval
+        self.max_rss_mb = max_rss_mb
+        self.max_requests = max_requests
+        self._task: Optional[asyncio.Task] = None
+        self._last_cpu: Dict[int, Tuple[float, float]] = {}
+        self._labels: Dict[int, Dict[str, str]] = {}
+        self._recycling: Set[Tuple[str, int]] = set()
+
+    @property
+    def supported(self) -> bool:
+        return os.path.isdir("/proc/self/task")
+
+    def start(self) -> Optional[asyncio.Task]:
+        if not self.supported:
+            logger.info("Resource monitoring disabled: /proc not available")
+            return None
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def server_trees(self) -> List[Tuple[str, str, int]]:
+        """(server name, kind, root pid) for every server process tree"""
+        servers = config_store.current.servers
+        trees = [
+            (name, "managed", process.pid)
+            for name, process in server_manager.processes.items()
+            if process.returncode is None
+        ]
+        managed = {pid for _, _, pid in trees}
+        for pid in child_pids(os.getpid()):
+            if pid in managed:
+                continue
+            command_line = cmdline(pid)
+            for name, server_config in servers.items():
+                if not server_config.get("native") and matches_server(command_line, server_config):
+                    kind = "browser" if name == browser_pool.server_name and browser_pool.owns(pid) else "session"
+                    trees.append((name, kind, pid))
+                    break
+        return trees
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error(f"Resource monitor error: {e}")
+
+    async def check(self) -> None:
+        """Sample every server tree, publish metrics and recycle offenders"""
+        now = time.monotonic()
+        trees = await asyncio.to_thread(
+            lambda: [(name, kind, pid, sample_tree(pid)) for name, kind, pid in self.server_trees()]
+        )
+        seen = set()
+        for name, kind, pid, stats in trees:
+            seen.add(pid)
+            # Several trees can belong to one server (e.g. browser contexts)
+            labels = self._labels[pid] = {"server": name, "kind": kind, "pid": str(pid)}
+            cpu_percent = 0.0
+            last = self._last_cpu.get(pid)
+            if last is not None and now > last[0]:
+                cpu_percent = 100.0 * (stats.cpu_seconds - last[1]) / (now - last[0])
+            self._last_cpu[pid] = (now, stats.cpu_seconds)
+
+            metrics.gauge("mcp_server_rss_bytes", stats.rss_bytes, **labels)
+            metrics.gauge("mcp_server_cpu_percent", cpu_percent, **labels)
+            metrics.gauge("mcp_server_open_fds", stats.open_fds, **labels)
+            metrics.gauge("mcp_server_processes", stats.processes, **labels)
+
+            reason = self._over_threshold(name, kind, stats)
+            if reason and (name, pid) not in self._recycling:
+                asyncio.create_task(self.recycle(name, kind, pid, reason))
+
+        for pid in set(self._labels) - seen:
+            self._last_cpu.pop(pid, None)
+            labels = self._labels.pop(pid)
+            for name in ("mcp_server_rss_bytes", "mcp_server_cpu_percent",
+                         "mcp_server_open_fds", "mcp_server_processes"):
+                metrics.remove(name, **labels)
+
+        for name, session in session_pool.sessions().items():
+            metrics.gauge("mcp_session_requests_served", session.requests_served, server=name)
+            metrics.gauge("mcp_session_in_flight", session.in_flight, server=name)
+
+    def _over_threshold(self, name: str, kind: str, stats: ProcessTreeStats) -> Optional[str]:
+        server_config = config_store.current.servers.get(name, {})
+        max_rss_mb = server_config.get("max_rss_mb", self.max_rss_mb)
+        if max_rss_mb and stats.rss_bytes > max_rss_mb * 1024 * 1024:
+            return f"rss {stats.rss_bytes / 1024 / 1024:.0f}MB > {max_rss_mb}MB"
+        max_requests = server_config.get("max_requests", self.max_requests)
+        session = session_pool.sessions().get(name)
+        if kind == "session" and max_requests and session is not None \
+                and session.requests_served >= max_requests:
+            return f"{session.requests_served} requests >= {max_requests}"
+        return None
+
+    async def recycle(self, name: str, kind: str, pid: int, reason: str) -> None:
+        """Drain and replace a server. Pooled sessions are closed once their
+        in-flight calls finish and reopen on next use; browser contexts are
+        retired after their lease and replaced; managed processes are
+        restarted."""
+        if kind == "session" and name not in session_pool.sessions():
+            # A per-call (unpooled) session: it goes away when its call ends
+            logger.debug(f"Not recycling unpooled session of {name}: {reason}")
+            return
+        self._recycling.add((name, pid))
+        try:
+            logger.warning(f"Recycling {kind} server {name} (pid {pid}): {reason}")
+            metrics.increment("mcp_server_recycles_total", server=name, kind=kind)
+            if kind == "browser":
+                await browser_pool.recycle(pid)
+            elif kind == "session":
+                await session_pool.close(name)
+            else:
+                server_config = config_store.current.servers.get(name)
+                if server_config is not None:
+                    await server_manager.restart_server(name, server_config)
+        except Exception as e:
+            logger.error(f"Failed to recycle server {name}: {e}")
+        finally:
+            self._recycling.discard((name, pid))
+
+def _env_number(name: str, cast):
+    value = os.getenv(name)
+    return cast(value) if value else None
+
+resource_monitor = ResourceMonitor(
+    interval=float(os.getenv("MCP_MONITOR_INTERVAL", "15")),
+    max_rss_mb=_env_number("MCP_MAX_SERVER_RSS_MB", float),
+    max_requests=_env_number("MCP_MAX_SERVER_REQUESTS", int),
+)
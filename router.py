@@ -0,0 +1,168 @@
+"""
+Request router for the LangGraph MCP system.
+
+Routing runs in three tiers, cheapest first:
+1. an exact lookup of the normalized query in an LRU route cache
+2. a local keyword classifier that scores each configured server
+3. an LLM call with the router system prompt, used only when the
+   classifier's confidence is below the configured threshold
+
+When the LLM call fails the classifier's guess is used, but it is not
+cached and the caller is told the route was a fallback.
+"""
+import logging
+import re
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from src.langgraph_mcp.catalog import capability_catalog
+from src.langgraph_mcp.configuration import Configuration
+from src.langgraph_mcp.deadline import DeadlineExceeded
+from src.langgraph_mcp.model_selector import model_selector
+from src.langgraph_mcp.prompt_renderer import prompt_renderer
+from src.langgraph_mcp.utils import get_message_text
+
+logger = logging.getLogger(__name__)
+
+NO_ROUTE = "none"
+
+_PUNCTUATION = re.compile(r"[^\w\s-]")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_query(query: str) -> str:
+    """Normalize a query so trivially different phrasings share a cache entry"""
+    query = _PUNCTUATION.sub(" ", query.lower())
+    return _WHITESPACE.sub(" ", query).strip()
+
+class RouteCache:
+    """Bounded LRU cache of normalized query -> server name (or NO_ROUTE)"""
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        route = self._entries.get(key)
+        if route is not None:
+            self._entries.move_to_end(key)
+        return route
+
+    def put(self, key: str, route: str) -> None:
+        self._entries[key] = route
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class KeywordClassifier:
+    """Weighted keyword scorer used as the local routing tier"""
+
+    DEFAULT_KEYWORDS: Dict[str, Dict[str, float]] = {
+        "brave-search": {
+            "weather": 1.0, "temperature": 1.0, "forecast": 1.0, "news": 1.0,
+            "search": 0.8, "latest": 0.6, "current": 0.4, "price": 0.5,
+            "who": 0.3, "when": 0.3,
+        },
+        "filesystem": {
+            "files": 1.0, "directory": 1.0, "directories": 1.0, "folder": 1.0,
+            "file": 0.8, "list": 0.6, "read": 0.4, "path": 0.5,
+        },
+        "puppeteer": {
+            "browser": 1.0, "navigate": 1.0, "screenshot": 1.0, "click": 1.0,
+            "website": 0.6, "webpage": 0.8, "page": 0.3, "url": 0.6,
+        },
+        "mcp-reasoner": {
+            "reason": 0.8, "reasoning": 1.0, "prove": 1.0, "proof": 1.0,
+            "solve": 0.8, "puzzle": 1.0, "analyze": 0.5, "step": 0.3,
+        },
+    }
+
+    def __init__(self, keywords: Optional[Dict[str, Dict[str, float]]] = None):
+        self.keywords = keywords or self.DEFAULT_KEYWORDS
+
+    def classify(self, normalized_query: str, servers: Iterable[str]) -> Tuple[str, float]:
+        """Return (server, confidence) for a normalized query.
+
+        Confidence combines how much of the total score the best server holds
+        with how strong that score is on its own, so a single weak keyword
+        never yields a confident route.
+        """
+        tokens = set(normalized_query.split())
+        scores = {}
+        for server in servers:
+            weights = self.keywords.get(server, {})
+            scores[server] = sum(weights.get(token, 0.0) for token in tokens)
+
+        total = sum(scores.values())
+        if total <= 0:
+            return NO_ROUTE, 0.0
+
+        best = max(scores, key=scores.get)
+        share = scores[best] / total
+        return best, share * min(1.0, scores[best])
+
+class Router:
+    """Three-tier router; LLM decisions are written back to the route cache"""
+
+    def __init__(self, cache: Optional[RouteCache] = None,
+                 classifier: Optional[KeywordClassifier] = None):
+        self.cache = cache or RouteCache()
+        self.classifier = classifier or KeywordClassifier()
+
+    async def route(self, query: str, configuration: Configuration) -> Tuple[Optional[str], bool]:
+        """Return the MCP server name for a query (None if no tool is needed)
+        and whether it is a settled decision rather than a fallback guess"""
+        servers = [name for name, _ in configuration.get_mcp_server_descriptions()]
+        key = normalize_query(query)
+
+        cached = self.cache.get(key)
+        if cached is not None and (cached == NO_ROUTE or cached in servers):
+            logger.debug(f"Route cache hit: {key!r} -> {cached}")
+            return self._as_server(cached), True
+
+        route, confidence = self.classifier.classify(key, servers)
+        logger.debug(f"Classifier: {key!r} -> {route} ({confidence:.2f})")
+
+        if confidence < configuration.routing_confidence_threshold:
+            try:
+                route = await self._route_with_llm(query, configuration, servers)
+            except DeadlineExceeded:
+                # Out of time: use the classifier's guess but don't remember it
+                logger.warning("LLM routing hit the request deadline, using classifier result")
+                return self._as_server(route), False
+            except Exception as e:
+                # A low-confidence guess is not worth remembering either
+                logger.error(f"LLM routing failed, using classifier result: {e}")
+                return self._as_server(route), False
+
+        self.cache.put(key, route)
+        return self._as_server(route), True
+
+    async def _route_with_llm(self, query: str, configuration: Configuration,
+                              servers: list) -> str:
+        response = await model_selector.ainvoke("routing", configuration, [
+            SystemMessage(content=prompt_renderer.router_system_prompt(
+                configuration.router_system_prompt,
+                configuration.mcp_server_config,
+                capability_catalog.descriptions(configuration.mcp_server_config),
+            )),
+            HumanMessage(content=query),
+        ])
+        answer = get_message_text(response).strip().strip("'\"`.").lower()
+        for server in servers:
+            if answer == server.lower():
+                return server
+        return NO_ROUTE
+
+    @staticmethod
+    def _as_server(route: str) -> Optional[str]:
+        return None if route == NO_ROUTE else route
+
+router = Router()
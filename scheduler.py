@@ -0,0 +1,182 @@
+"""
+Priority-aware request scheduling.
+
+Every request has a priority class (interactive or batch) and a tenant.
+A FairScheduler admits at most `capacity` holders at a time. Waiting
+interactive requests are always admitted before batch ones, and `reserved`
+slots are kept for interactive traffic only, so batch load can never take
+the whole scheduler. Within a class, tenants share admissions by weighted
+fair queuing (start-time fair queuing). Each request is tagged with the
+later of the scheduler's virtual clock and its tenant's previous finish
+tag, and the lowest tag is admitted first. As a result, a tenant that
+floods the queue only delays itself.
+
+The request class travels in a context variable, so MCP sessions below
+the graph schedule calls with the class of the request they serve. Queue
+wait is exported as the `scheduler_queue_wait_seconds` summary.
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional
+
+from src.langgraph_mcp.metrics import metrics
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)
+
+@dataclass(frozen=True)
+class RequestClass:
+    tenant: str = "default"
+    priority: str = INTERACTIVE
+
+_current: ContextVar[RequestClass] = ContextVar("request_class", default=RequestClass())
+
+def set_request_class(tenant: str = "default", priority: str = INTERACTIVE):
+    """Make the request class current for this task and the tasks it creates"""
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority {priority!r}, expected one of {PRIORITIES}")
+    return _current.set(RequestClass(tenant, priority))
+
+def reset_request_class(token) -> None:
+    _current.reset(token)
+
+def current_request_class() -> RequestClass:
+    return _current.get()
+
+@dataclass(order=True)
+class _Waiter:
+    start: float
+    seq: int
+    request_class: RequestClass = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+class FairScheduler:
+    def __init__(self, name: str, capacity: int, reserved: int = 0,
+                 weights: Optional[Dict[str, float]] = None):
+        self.name = name
+        self.capacity = capacity
+        # Batch traffic always keeps at least one slot
+        self.reserved = max(min(reserved, capacity - 1), 0)
+        self.weights = weights if weights is not None else tenant_weights
+        self.in_use = 0
+        self._queues: Dict[str, List[_Waiter]] = {priority: [] for priority in PRIORITIES}
+        self._virtual_time = 0.0
+        self._last_finish: Dict[str, float] = {}
+        self._seq = itertools.count()
+
+    def _limit(self, priority: str) -> int:
+        return self.capacity if priority == INTERACTIVE else self.capacity - self.reserved
+
+    def _ahead(self, priority: str) -> bool:
+        """Whether earlier requests of this class or a higher one are waiting"""
+        for queued in PRIORITIES:
+            if self._queues[queued]:
+                return True
+            if queued == priority:
+                return False
+        return False
+
+    def _tag(self, tenant: str) -> float:
+        start = max(self._virtual_time, self._last_finish.get(tenant, 0.0))
+        self._last_finish[tenant] = start + 1.0 / self.weights.get(tenant, 1.0)
+        if len(self._last_finish) > 1024:
+            # Tenants at or behind the clock have no credit left to remember
+            self._last_finish = {
+                name: finish for name, finish in self._last_finish.items()
+                if finish > self._virtual_time
+            }
+        return start
+
+    async def acquire(self, request_class: Optional[RequestClass] = None) -> None:
+        """Wait for a slot; the caller must `release()` it"""
+        request_class = request_class or current_request_class()
+        started = time.monotonic()
+        start = self._tag(request_class.tenant)
+        if not self._ahead(request_class.priority) and self.in_use < self._limit(request_class.priority):
+            self.in_use += 1
+            self._virtual_time = max(self._virtual_time, start)
+            self._observe(request_class, 0.0)
+            return
+
+        waiter = _Waiter(start, next(self._seq), request_class,
+                         asyncio.get_running_loop().create_future())
+        queue = self._queues[request_class.priority]
+        heapq.heappush(queue, waiter)
+        self._publish()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted just as the wait was cancelled: pass the slot on
+                self.release()
+            elif waiter in queue:
+                queue.remove(waiter)
+                heapq.heapify(queue)
+                self._publish()
+            raise
+        self._observe(request_class, time.monotonic() - started)
+
+    def release(self) -> None:
+        self.in_use -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, request_class: Optional[RequestClass] = None) -> AsyncIterator[None]:
+        await self.acquire(request_class)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def _dispatch(self) -> None:
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            while queue and self.in_use < self._limit(priority):
+                waiter = heapq.heappop(queue)
+                if waiter.future.done():
+                    continue
+                self.in_use += 1
+                self._virtual_time = max(self._virtual_time, waiter.start)
+                waiter.future.set_result(None)
+            if queue:
+                # Lower classes never jump a waiting higher class
+                break
+        self._publish()
+
+    def queued(self, priority: Optional[str] = None) -> int:
+        if priority is not None:
+            return len(self._queues[priority])
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _observe(self, request_class: RequestClass, wait: float) -> None:
+        metrics.observe("scheduler_queue_wait_seconds", wait, scheduler=self.name,
+                        priority=request_class.priority, tenant=request_class.tenant)
+
+    def _publish(self) -> None:
+        metrics.gauge("scheduler_in_use", self.in_use, scheduler=self.name)
+        for priority in PRIORITIES:
+            metrics.gauge("scheduler_queue_depth", len(self._queues[priority]),
+                          scheduler=self.name, priority=priority)
+
+def parse_weights(value: str) -> Dict[str, float]:
+    """Parse `tenant=weight,tenant=weight` (MCP_TENANT_WEIGHTS)"""
+    weights = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        tenant, _, weight = item.partition("=")
+        weights[tenant.strip()] = float(weight)
+    return weights
+
+tenant_weights = parse_weights(os.getenv("MCP_TENANT_WEIGHTS", ""))
+
+request_scheduler = FairScheduler(
+    "requests",
+    capacity=int(os.getenv("MCP_MAX_CONCURRENT_REQUESTS", "8")),
+    reserved=int(os.getenv("MCP_RESERVED_INTERACTIVE", "2")),
+)
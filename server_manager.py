@@ -1,17 +1,23 @@
 import asyncio
+import os
 import signal
 import sys
 import weakref
 from contextlib import asynccontextmanager, suppress
-from typing import Dict, Optional
+from typing import Any, Dict, Optional
 from asyncio.subprocess import Process
 from src.langgraph_mcp.cleanup_manager import cleanup_manager
+from src.langgraph_mcp.config_store import ConfigChange
+from src.langgraph_mcp.browser_pool import browser_pool
+from src.langgraph_mcp.mcp_wrapper import is_network_server, server_reachable, session_pool
+from src.langgraph_mcp import traffic
 from src.langgraph_mcp.logging_config import cleanup_logger as logger
 
 class ServerManager:
     def __init__(self):
         self.active_servers = weakref.WeakSet()
         self.processes: Dict[str, Process] = {}
+        self.tasks: Dict[str, asyncio.Task] = {}
         self._shutdown_event = asyncio.Event()
         self._lock = asyncio.Lock()
 
@@ -21,26 +27,133 @@ class ServerManager:
             try:
                 task = asyncio.create_task(coro)
                 self.active_servers.add(task)
+                self.tasks[name] = task
                 return task
             except Exception as e:
                 logger.error(f"Failed to add server {name}: {e}")
                 raise
 
-    async def create_server_process(self, name: str, cmd: list, env: dict) -> Process:
-        """Create and register a server process"""
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdin=asyncio.subprocess.PIPE,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            env=env
-        )
+    async def create_server_process(self, name: str, cmd: list, env: dict,
+                                    stdio: bool = True) -> Process:
+        """Create and register a server process.
+
+        Network servers (`stdio=False`) get no pipes: their protocol runs over
+        a socket, and pipes inherited by forked workers would keep them open.
+        """
+        if stdio:
+            streams = dict(stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+                           stderr=asyncio.subprocess.PIPE)
+        else:
+            streams = dict(stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.DEVNULL)
+        process = await asyncio.create_subprocess_exec(*cmd, env=env, **streams)
         self.processes[name] = process
         cleanup_manager.register_process(name, process)
         return process
 
+    async def start_server(self, name: str, config: Dict[str, Any]) -> Optional[asyncio.Task]:
+        """Start an MCP server process and a task that supervises it.
+
+        Only network servers are started here. A network server that is
+        already reachable (started by the supervisor or another process on
+        this node) is shared instead of started again. Stdio servers are
+        children of the session that talks to them: pooled ones are opened
+        in the background through the session pool (puppeteer through the
+        browser pool), unpooled ones start per call.
+        """
+        if config.get("native"):
+            logger.info(f"Server {name} runs in-process, no process started")
+            return None
+        if traffic.replay_log is not None:
+            logger.info(f"Replaying recorded traffic, not starting server {name}")
+            return None
+        if not is_network_server(config):
+            if config.get("pooled", True) and name != browser_pool.server_name:
+                asyncio.create_task(self._open_session(name, config))
+            return None
+        if await server_reachable(config["url"]):
+            logger.info(f"Using shared server {name} at {config['url']}")
+            return None
+        if not config.get("command"):
+            raise ConnectionError(f"Shared server {name} is not reachable at {config['url']}")
+        cmd = [config["command"]] + config["args"]
+        env = {**os.environ, **(config.get("env") or {})}
+        process = await self.create_server_process(name, cmd, env, stdio=False)
+        await self._wait_reachable(name, config, process)
+
+        async def run_server():
+            try:
+                await process.wait()
+            finally:
+                if process.returncode is None:
+                    process.terminate()
+                    await process.wait()
+
+        return await self.add_server(name, run_server())
+
+    async def _open_session(self, name: str, config: Dict[str, Any]) -> None:
+        try:
+            await session_pool.get(name, config)
+            logger.info(f"Session for server {name} ready")
+        except Exception as e:
+            # The pool retries on the first call that needs the server
+            logger.error(f"Failed to open session for server {name}: {e}")
+
+    async def _wait_reachable(self, name: str, config: Dict[str, Any], process: Process) -> None:
+        timeout = config.get("startup_timeout", 30.0)
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not await server_reachable(config["url"]):
+            if process.returncode is not None:
+                await self.stop_server(name)
+                raise RuntimeError(f"Server {name} exited with code {process.returncode} during startup")
+            if asyncio.get_running_loop().time() > deadline:
+                await self.stop_server(name)
+                raise TimeoutError(f"Server {name} not reachable at {config['url']} after {timeout}s")
+            await asyncio.sleep(0.2)
+        logger.info(f"Shared server {name} listening at {config['url']}")
+
+    def detach(self) -> None:
+        """Forget inherited processes without stopping them.
+
+        Called in forked workers: servers the supervisor started belong to
+        the supervisor, and a worker shutting down must not terminate them.
+        """
+        for name in list(self.processes):
+            cleanup_manager.unregister_process(name)
+        self.processes.clear()
+        self.tasks.clear()
+        self.active_servers = weakref.WeakSet()
+
+    async def stop_server(self, name: str, timeout: float = 5.0) -> None:
+        """Stop a single server, leaving the others running"""
+        process = self.processes.pop(name, None)
+        task = self.tasks.pop(name, None)
+        if process is not None:
+            cleanup_manager.unregister_process(name)
+            await cleanup_manager.cleanup_process(name, process, timeout)
+        if task is not None and not task.done():
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+    async def restart_server(self, name: str, config: Dict[str, Any]) -> Optional[asyncio.Task]:
+        """Replace a running server with one started from `config`"""
+        logger.info(f"Restarting server: {name}")
+        await self.stop_server(name)
+        return await self.start_server(name, config)
+
+    async def apply_config_change(self, change: ConfigChange) -> None:
+        """Config store listener: restart only servers whose entries changed"""
+        for name in change.removed:
+            await self.stop_server(name)
+        for name in change.changed:
+            await self.restart_server(name, change.current.servers[name])
+        for name in change.added:
+            await self.start_server(name, change.current.servers[name])
+
     async def shutdown(self, timeout: float = 5.0):
         """Graceful shutdown"""
+        await session_pool.close_all()
+        await browser_pool.close()
         if not self.active_servers and not self.processes:
             return
 
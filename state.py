@@ -1,19 +1,50 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+"""
+The graph state.
+
+One slotted dataclass is the state schema for the whole graph. Each
+field is a channel. `messages` and `tool_results` have reducers, so
+nodes return only the items they add rather than rebuilt lists. Both
+reducers are plain list concatenation: nodes only ever append
+BaseMessage instances, so add_messages' coercion, id assignment and
+replace-by-id would only add per-step cost. `query`
+and `route` are plain last-value channels set by the router, and
+`cacheable` marks answers from read-only steps that succeeded, which are
+the only ones the response cache keeps.
+
+Validation runs on every state the graph builds, but only when
+MCP_DEBUG_STATE=1. Without it the class has no __post_init__ at all.
+"""
+import operator
+import os
+from dataclasses import dataclass, field
+from typing import Annotated, List, Optional
+
 from langchain_core.messages import BaseMessage
 
-class GraphState(BaseModel):
-    messages: List[BaseMessage] = Field(default_factory=list)
-    current_mcp_server: Optional[str] = None
-    tool_outputs: List[str] = Field(default_factory=list)
+DEBUG_STATE = os.getenv("MCP_DEBUG_STATE") == "1"
+
+def validate_state(state: "GraphState") -> None:
+    """Raise ValueError if the state is malformed"""
+    if not state.messages:
+        raise ValueError("State must contain at least one message")
+    if not all(isinstance(message, BaseMessage) for message in state.messages):
+        raise ValueError("messages must only contain BaseMessage instances")
+    if not isinstance(state.query, str):
+        raise ValueError("query must be a string")
+    if state.route is not None and not isinstance(state.route, str):
+        raise ValueError("route must be a string or None")
+    if not all(isinstance(result, str) for result in state.tool_results):
+        raise ValueError("tool_results must only contain strings")
 
-    class Config:
-        arbitrary_types_allowed = True
+@dataclass(slots=True)
+class GraphState:
+    messages: Annotated[List[BaseMessage], operator.add] = field(default_factory=list)
+    query: str = ""
+    route: Optional[str] = None
+    tool_results: Annotated[List[str], operator.add] = field(default_factory=list)
+    # Set only by read-only steps that succeeded; the answer may then be reused
+    cacheable: bool = False
 
-    def validate_state(self) -> bool:
-        """Validate the current state"""
-        if not self.messages:
-            raise ValueError("State must contain at least one message")
-        if self.current_mcp_server and not isinstance(self.current_mcp_server, str):
-            raise ValueError("current_mcp_server must be a string or None")
-        return True
\ No newline at end of file
+    if DEBUG_STATE:
+        def __post_init__(self) -> None:
+            validate_state(self)
@@ -0,0 +1,290 @@
+"""
+Multi-worker process mode.
+
+The supervisor forks N worker processes. Each worker runs its own event loop
+and MCP server pool and serves newline-delimited JSON requests on a private
+Unix socket. Requests are dispatched with session affinity: every request of a
+conversation thread goes to the same worker.
+
+`Supervisor.serve` accepts the same requests from clients on a Unix socket.
+Each client connection is a conversation of its own, so concurrent clients
+spread over the workers, and requests on one connection are handled
+concurrently. A line that is not a JSON object gets an error response
+instead of closing the connection.
+
+MCP servers with a network transport are started once by the supervisor
+before the workers fork; each worker then holds a pooled connection to
+the one shared instance instead of spawning its own.
+"""
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import tempfile
+import uuid
+import zlib
+from contextlib import suppress
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from src.langgraph_mcp.logging_config import cleanup_logger as logger
+
+RequestHandler = Callable[..., Awaitable[Dict[str, Any]]]
+Startup = Callable[[], Awaitable[Any]]
+
+# Per-request options a client may set, passed through to the handler
+REQUEST_OPTIONS = ("bypass_cache", "profile", "tenant", "priority")
+
+def _parse_message(line: bytes) -> Dict[str, Any]:
+    """Decode one NDJSON request; ValueError if it is not a JSON object"""
+    message = json.loads(line)
+    if not isinstance(message, dict):
+        raise ValueError(f"expected a JSON object, got {type(message).__name__}")
+    return message
+
+def _error_response(request_id: Any, error: str) -> bytes:
+    return json.dumps({"id": request_id, "answer": None, "error": error, "elapsed": 0.0}).encode() + b"\n"
+
+def _worker_main(index: int, socket_path: str, handler: RequestHandler, startup: Startup) -> None:
+    """Worker process entry point"""
+    from src.langgraph_mcp.server_manager import server_manager
+
+    # Interrupts are handled by the supervisor, which shuts workers down in order
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Shared servers started by the supervisor are not this worker's to stop
+    server_manager.detach()
+    # Per-worker resources such as the metrics port are offset by this index
+    os.environ["MCP_WORKER_INDEX"] = str(index)
+    asyncio.run(_serve(index, socket_path, handler, startup))
+
+async def _serve(index: int, socket_path: str, handler: RequestHandler, startup: Startup) -> None:
+    from src.langgraph_mcp.server_manager import manage_event_loop
+
+    async with manage_event_loop() as loop:
+        loop.remove_signal_handler(signal.SIGINT)
+        stopping = asyncio.Event()
+        loop.add_signal_handler(signal.SIGTERM, stopping.set)
+
+        await startup()
+
+        async def handle_request(message: Dict[str, Any], writer: asyncio.StreamWriter) -> None:
+            try:
+                response = await handler(
+                    message["input"],
+                    message.get("thread_id", "default"),
+                    bypass_cache=message.get("bypass_cache", False),
+                    profile=message.get("profile", False),
+                    tenant=message.get("tenant", "default"),
+                    priority=message.get("priority", "interactive")
+                )
+            except Exception as e:
+                response = {"answer": None, "error": str(e), "elapsed": 0.0}
+            response["id"] = message.get("id")
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+
+        async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            pending = set()
+            try:
+                while not reader.at_eof():
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    try:
+                        message = _parse_message(line)
+                    except ValueError as e:
+                        logger.warning(f"Worker {index} got a malformed request: {e}")
+                        writer.write(_error_response(None, f"Malformed request: {e}"))
+                        continue
+                    if message.get("type") == "shutdown":
+                        stopping.set()
+                        break
+                    task = asyncio.create_task(handle_request(message, writer))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+                if pending:
+                    await asyncio.gather(*pending, return_exceptions=True)
+            finally:
+                writer.close()
+
+        server = await asyncio.start_unix_server(handle_connection, path=socket_path)
+        logger.info(f"Worker {index} (pid {os.getpid()}) listening on {socket_path}")
+        async with server:
+            await stopping.wait()
+        logger.info(f"Worker {index} stopping")
+
+@dataclass
+class _WorkerHandle:
+    index: int
+    socket_path: str
+    process: multiprocessing.process.BaseProcess
+    reader: Optional[asyncio.StreamReader] = None
+    writer: Optional[asyncio.StreamWriter] = None
+    pending: Dict[int, asyncio.Future] = field(default_factory=dict)
+    reader_task: Optional[asyncio.Task] = None
+
+class Supervisor:
+    def __init__(self, workers: int, handler: RequestHandler, startup: Startup,
+                 socket_dir: Optional[str] = None, shared_startup: Optional[Startup] = None):
+        if sys.platform == "win32":
+            raise RuntimeError("Multi-worker mode requires Unix domain sockets")
+        self.num_workers = workers
+        self.handler = handler
+        self.startup = startup
+        self.shared_startup = shared_startup
+        self.socket_dir = socket_dir or tempfile.mkdtemp(prefix="langgraph_mcp_")
+        self.workers: List[_WorkerHandle] = []
+        self._ids = itertools.count()
+
+    async def start(self, timeout: float = 60.0) -> None:
+        """Start shared servers, fork the workers and connect to each once its socket is ready"""
+        if self.shared_startup is not None:
+            await self.shared_startup()
+        context = multiprocessing.get_context("fork")
+        for index in range(self.num_workers):
+            socket_path = os.path.join(self.socket_dir, f"worker-{index}.sock")
+            process = context.Process(
+                target=_worker_main,
+                args=(index, socket_path, self.handler, self.startup),
+                name=f"langgraph-mcp-worker-{index}",
+                daemon=True,
+            )
+            process.start()
+            self.workers.append(_WorkerHandle(index, socket_path, process))
+
+        await asyncio.gather(*(self._connect(worker, timeout) for worker in self.workers))
+        logger.info(f"Supervisor started {self.num_workers} workers")
+
+    async def _connect(self, worker: _WorkerHandle, timeout: float) -> None:
+        deadline = asyncio.get_running_loop().time() + timeout
+        while True:
+            try:
+                worker.reader, worker.writer = await asyncio.open_unix_connection(worker.socket_path)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                if not worker.process.is_alive():
+                    raise RuntimeError(f"Worker {worker.index} exited during startup")
+                if asyncio.get_running_loop().time() > deadline:
+                    raise TimeoutError(f"Worker {worker.index} did not start within {timeout}s")
+                await asyncio.sleep(0.1)
+        worker.reader_task = asyncio.create_task(self._read_responses(worker))
+
+    async def _read_responses(self, worker: _WorkerHandle) -> None:
+        try:
+            while True:
+                line = await worker.reader.readline()
+                if not line:
+                    break
+                response = json.loads(line)
+                future = worker.pending.pop(response.pop("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        finally:
+            for future in worker.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError(f"Worker {worker.index} disconnected"))
+            worker.pending.clear()
+
+    def worker_for(self, thread_id: str) -> _WorkerHandle:
+        """Stable thread -> worker mapping (crc32 is consistent across processes)"""
+        return self.workers[zlib.crc32(thread_id.encode()) % len(self.workers)]
+
+    async def submit(self, user_input: str, thread_id: str = "default",
+                     bypass_cache: bool = False, profile: bool = False,
+                     tenant: str = "default", priority: str = "interactive") -> Dict[str, Any]:
+        worker = self.worker_for(thread_id)
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        worker.pending[request_id] = future
+        worker.writer.write(json.dumps({
+            "id": request_id, "input": user_input, "thread_id": thread_id,
+            "bypass_cache": bypass_cache, "profile": profile,
+            "tenant": tenant, "priority": priority
+        }).encode() + b"\n")
+        await worker.writer.drain()
+        return await future
+
+    async def serve(self, path: str, **options: Any) -> None:
+        """Accept client requests on a Unix socket at `path` until cancelled.
+
+        Clients send `{"id", "input"}` lines, optionally with `thread_id` and
+        any of REQUEST_OPTIONS (defaults come from `options`), and get the
+        response with the same `id`. Requests without a `thread_id` belong
+        to their connection's conversation.
+        """
+        async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            # Unique across restarts, so a new client never shares an old conversation
+            thread_id = f"connection-{uuid.uuid4().hex}"
+            pending = set()
+
+            async def respond(message: Dict[str, Any]) -> None:
+                try:
+                    response = await self.submit(
+                        message["input"], message.get("thread_id", thread_id),
+                        **{**options, **{key: message[key] for key in REQUEST_OPTIONS if key in message}}
+                    )
+                except Exception as e:
+                    response = {"answer": None, "error": str(e), "elapsed": 0.0}
+                response["id"] = message.get("id")
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    try:
+                        message = _parse_message(line)
+                    except ValueError as e:
+                        writer.write(_error_response(None, f"Malformed request: {e}"))
+                        continue
+                    task = asyncio.create_task(respond(message))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+                if pending:
+                    await asyncio.gather(*pending, return_exceptions=True)
+            finally:
+                writer.close()
+
+        server = await asyncio.start_unix_server(handle_connection, path=path)
+        logger.info(f"Supervisor accepting requests on {path}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            with suppress(FileNotFoundError):
+                os.unlink(path)
+
+    async def shutdown(self, timeout: float = 10.0) -> None:
+        """Ask every worker to drain and exit; terminate any that do not"""
+        for worker in self.workers:
+            if worker.writer is not None and not worker.writer.is_closing():
+                with suppress(Exception):
+                    worker.writer.write(json.dumps({"type": "shutdown"}).encode() + b"\n")
+                    await worker.writer.drain()
+
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(None, worker.process.join, timeout)
+            for worker in self.workers
+        ))
+
+        for worker in self.workers:
+            if worker.process.is_alive():
+                logger.warning(f"Worker {worker.index} did not exit, terminating")
+                worker.process.terminate()
+                worker.process.join(timeout)
+            if worker.reader_task is not None:
+                worker.reader_task.cancel()
+            if worker.writer is not None:
+                worker.writer.close()
+            with suppress(FileNotFoundError):
+                os.unlink(worker.socket_path)
+
+        with suppress(OSError):
+            os.rmdir(self.socket_dir)
+        logger.info("Supervisor shutdown complete")
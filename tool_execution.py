@@ -1,10 +1,20 @@
 import asyncio
-from typing import Dict, Any, List
-from langchain_core.messages import AIMessage
+import re
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
 import json
 import logging
 from src.langgraph_mcp import mcp_wrapper as mcp
-from src.langgraph_mcp.utils import get_message_text, load_chat_model
+from src.langgraph_mcp.browser_pool import browser_pool
+from src.langgraph_mcp.catalog import capability_catalog
+from src.langgraph_mcp.configuration import Configuration
+from src.langgraph_mcp.deadline import get_deadline, within_deadline
+from src.langgraph_mcp.model_selector import model_selector
+from src.langgraph_mcp.prompt_renderer import prompt_renderer
+from src.langgraph_mcp.router import router
+from src.langgraph_mcp.utils import get_message_text
 from src.langgraph_mcp.state import GraphState
 
 logger = logging.getLogger(__name__)
@@ -13,8 +23,6 @@ async def execute_brave_search(config: Dict[str, Any], query: str) -> Dict[str,
     """Execute Brave Search directly"""
     try:
         server_config = config["mcpServers"]["brave-search"]
-        tools = await mcp.apply("brave-search", server_config, mcp.GetTools())
-        
         result = await mcp.apply(
             "brave-search",
             server_config,
@@ -23,21 +31,20 @@ async def execute_brave_search(config: Dict[str, Any], query: str) -> Dict[str,
         
         return {
             "messages": [AIMessage(content=str(result))],
-            "tool_outputs": [str(result)]
+            "tool_results": [str(result)],
+            "cacheable": True
         }
     except Exception as e:
         logger.error(f"Brave Search error: {e}")
         return {
-            "messages": [AIMessage(content=f"Search error: {str(e)}")],
-            "tool_outputs": []
+            "messages": [AIMessage(content=f"Search error: {str(e)}")]
         }
 
 async def execute_filesystem(config: Dict[str, Any], query: str) -> Dict[str, Any]:
     """Execute filesystem operations"""
     try:
         server_config = config["mcpServers"]["filesystem"]
-        tools = await mcp.apply("filesystem", server_config, mcp.GetTools())
-        
+
         # Handle list directory request
         if "list" in query.lower():
             result = await mcp.apply(
@@ -54,59 +61,235 @@ async def execute_filesystem(config: Dict[str, Any], query: str) -> Dict[str, An
             
         return {
             "messages": [AIMessage(content=str(result))],
-            "tool_outputs": [str(result)]
+            "tool_results": [str(result)],
+            # Only listings are run here
+            "cacheable": True
         }
     except Exception as e:
         logger.error(f"Filesystem error: {e}")
         return {
-            "messages": [AIMessage(content=f"Filesystem error: {str(e)}")],
-            "tool_outputs": []
+            "messages": [AIMessage(content=f"Filesystem error: {str(e)}")]
         }
 
-async def route_request(state: GraphState, config: Dict) -> Dict[str, Any]:
-    """Simplified routing logic"""
-    try:
-        query = get_message_text(state["messages"][-1])
-        
-        # Simple routing based on keywords
-        if any(word in query.lower() for word in ["weather", "temperature"]):
-            return {
-                "messages": [AIMessage(content="Using brave-search...")],
-                "current_mcp_server": "brave-search",
-                "tool_outputs": [],
-                "query": query
-            }
-        elif any(word in query.lower() for word in ["list", "files", "directory"]):
-            return {
-                "messages": [AIMessage(content="Using filesystem...")],
-                "current_mcp_server": "filesystem",
-                "tool_outputs": [],
-                "query": query
-            }
+async def _run_server_calls(server_name: str, server_config: Dict[str, Any],
+                            calls: List[Dict[str, Any]],
+                            session: Optional[mcp.MultiplexedSession] = None) -> List[ToolMessage]:
+    """Run one server's tool calls concurrently over its shared (or leased) session"""
+    async def run(call: Dict[str, Any]) -> ToolMessage:
+        try:
+            fn = mcp.RunTool(call["name"], **call["args"])
+            if session is not None:
+                content = await session.apply(fn)
+            else:
+                content = await mcp.apply(server_name, server_config, fn)
+        except Exception as e:
+            logger.error(f"Tool {call['name']} on {server_name} failed: {e}")
+            content = f"Error: {e}"
+        return ToolMessage(content=str(content), tool_call_id=call["id"], name=call["name"])
+
+    return await asyncio.gather(*(run(call) for call in calls))
+
+async def run_tool_calls(tool_calls: List[Dict[str, Any]], tool_servers: Dict[str, str],
+                         mcp_server_config: Dict[str, Any],
+                         sessions: Optional[Dict[str, mcp.MultiplexedSession]] = None) -> List[ToolMessage]:
+    """Execute every tool call from one model turn in parallel, grouped by server.
+
+    `sessions` pins servers to specific sessions (e.g. a leased browser
+    context) instead of the shared pool. Results are returned in the order
+    of `tool_calls`.
+    """
+    sessions = sessions or {}
+    by_server: Dict[str, List[Dict[str, Any]]] = {}
+    messages: Dict[str, ToolMessage] = {}
+    for call in tool_calls:
+        server_name = tool_servers.get(call["name"])
+        if server_name is None:
+            messages[call["id"]] = ToolMessage(
+                content=f"Error: unknown tool {call['name']}", tool_call_id=call["id"], name=call["name"]
+            )
         else:
+            by_server.setdefault(server_name, []).append(call)
+
+    groups = await asyncio.gather(*(
+        _run_server_calls(
+            server_name, mcp_server_config["mcpServers"][server_name], calls, sessions.get(server_name)
+        )
+        for server_name, calls in by_server.items()
+    ))
+    for group in groups:
+        for message in group:
+            messages[message.tool_call_id] = message
+    return [messages[call["id"]] for call in tool_calls]
+
+async def run_tool_loop(mcp_server_config: Dict[str, Any], server_names: List[str],
+                        query: str, configuration: Configuration,
+                        sessions: Optional[Dict[str, mcp.MultiplexedSession]] = None) -> Dict[str, Any]:
+    """Let the execution model call tools until it answers or a budget runs out.
+
+    All tool calls the model emits in a turn run concurrently and their
+    results are fed back for the next turn. The loop stops after
+    `max_tool_iterations` model turns or `tool_loop_timeout` seconds, or
+    earlier when the request deadline runs out; the answer is then built
+    from whatever the completed turns produced.
+    """
+    servers = mcp_server_config["mcpServers"]
+    catalogs = await asyncio.gather(*(
+        capability_catalog.tools(name, servers[name]) for name in server_names
+    ))
+    tool_servers: Dict[str, str] = {}
+    tools: List[Dict[str, Any]] = []
+    for server_name, catalog in zip(server_names, catalogs):
+        for tool in catalog:
+            tool_servers[tool['function']['name']] = server_name
+        tools.extend(prompt_renderer.tool_schemas(catalog))
+
+    system_prompt = prompt_renderer.render(
+        configuration.executor_system_prompt,
+        {"tools": ", ".join(tool_servers)},
+        input=query,
+        system_time=datetime.now(tz=timezone.utc).isoformat(),
+    )
+    messages: List[BaseMessage] = [
+        SystemMessage(content=system_prompt.text),
+        HumanMessage(content=query),
+    ]
+    tool_outputs: List[str] = []
+    loop = asyncio.get_running_loop()
+    budget = configuration.tool_loop_timeout
+    request_deadline = get_deadline()
+    if request_deadline is not None:
+        budget = request_deadline.bound(budget)
+    deadline = loop.time() + budget
+
+    for iteration in range(configuration.max_tool_iterations):
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        try:
+            response = await model_selector.ainvoke(
+                "execution", configuration, messages, tools=tools, timeout=remaining
+            )
+        except asyncio.TimeoutError:
+            break
+        messages.append(response)
+        if not response.tool_calls:
+            return {"content": get_message_text(response), "tool_outputs": tool_outputs,
+                    "complete": True}
+
+        logger.info(f"Iteration {iteration + 1}: running {len(response.tool_calls)} tool calls")
+        try:
+            # Timing out cancels every outstanding call of the turn
+            results = await within_deadline(
+                "tool_calls",
+                run_tool_calls(response.tool_calls, tool_servers, mcp_server_config, sessions),
+                timeout=max(deadline - loop.time(), 0)
+            )
+        except asyncio.TimeoutError:
+            break
+        messages.extend(results)
+        tool_outputs.extend(str(result.content) for result in results)
+
+    logger.warning(f"Tool loop budget exhausted for query: {query!r}")
+    last_answer = next(
+        (get_message_text(m) for m in reversed(messages) if isinstance(m, AIMessage) and m.content),
+        ""
+    )
+    return {
+        "content": last_answer or "\n\n".join(tool_outputs) or "Tool budget exhausted without an answer",
+        "tool_outputs": tool_outputs,
+        "complete": False
+    }
+
+_URL = re.compile(r"https?://\S+")
+_PAGE_ACTIONS = ("click", "fill", "type", "screenshot", "select", "hover", "submit", "login", "evaluate")
+
+async def execute_puppeteer(config: Dict, query: str) -> Dict[str, Any]:
+    """Execute browser automation on a leased, warm browser context"""
+    try:
+        configuration = Configuration.from_runnable_config(config)
+        server_config = configuration.mcp_server_config["mcpServers"]["puppeteer"]
+
+        # Plain "read this page" requests go through the navigation cache
+        url = _URL.search(query)
+        if url and not any(action in query.lower() for action in _PAGE_ACTIONS):
+            text = await browser_pool.fetch_page(url.group(0).rstrip(".,)"), server_config)
             return {
-                "messages": [AIMessage(content="Using none...")],
-                "current_mcp_server": None,
-                "tool_outputs": []
+                "messages": [AIMessage(content=text)],
+                "tool_results": [text],
+                "cacheable": True
             }
+
+        async with browser_pool.lease(server_config) as session:
+            result = await run_tool_loop(
+                configuration.mcp_server_config, ["puppeteer"], query, configuration,
+                sessions={"puppeteer": session}
+            )
+        return {
+            "messages": [AIMessage(content=result["content"])],
+            "tool_results": result["tool_outputs"]
+        }
+    except Exception as e:
+        logger.error(f"Puppeteer error: {e}")
+        return {
+            "messages": [AIMessage(content=f"Puppeteer error: {str(e)}")]
+        }
+
+async def execute_with_model(config: Dict, server_name: str, query: str) -> Dict[str, Any]:
+    """Execute a request on any MCP server through the tool-calling loop"""
+    try:
+        configuration = Configuration.from_runnable_config(config)
+        result = await run_tool_loop(
+            configuration.mcp_server_config, [server_name], query, configuration
+        )
+        server_config = configuration.mcp_server_config["mcpServers"][server_name]
+        return {
+            "messages": [AIMessage(content=result["content"])],
+            "tool_results": result["tool_outputs"],
+            # Servers declare `"read_only": true` when their answers may be reused
+            "cacheable": result["complete"] and server_config.get("read_only", False)
+        }
+    except Exception as e:
+        logger.error(f"{server_name} error: {e}")
+        return {
+            "messages": [AIMessage(content=f"{server_name} error: {str(e)}")]
+        }
+
+async def route_request(state: GraphState, config: RunnableConfig) -> Dict[str, Any]:
+    """Route the latest message to an MCP server (cache, classifier, then LLM)"""
+    try:
+        query = get_message_text(state.messages[-1])
+        configuration = Configuration.from_runnable_config(config)
+        server, settled = await router.route(query, configuration)
+
+        if server:
+            return {"query": query, "route": server}
+        return {
+            "messages": [AIMessage(content="No MCP server is needed for this request")],
+            "query": query,
+            "route": None,
+            # Only a settled "no tool" decision; a fallback guess may be wrong
+            "cacheable": settled
+        }
     except Exception as e:
         logger.error(f"Routing error: {e}")
         return {
             "messages": [AIMessage(content=f"Error: {str(e)}")],
-            "current_mcp_server": None,
-            "tool_outputs": []
+            "route": None
         }
 
-async def execute_tool(state: GraphState, config: Dict) -> Dict[str, Any]:
+async def execute_tool(state: GraphState, config: RunnableConfig) -> Dict[str, Any]:
     """Simplified tool execution"""
     try:
-        tool_type = state.get("current_mcp_server")
-        query = state.get("query", "")
+        tool_type = state.route
+        query = state.query
         
         if not tool_type:
+            return {}
+
+        deadline = get_deadline(config)
+        if deadline is not None and deadline.expired:
             return {
-                "messages": state["messages"],
-                "tool_outputs": []
+                "messages": [AIMessage(content=f"Request deadline exceeded before running {tool_type}")]
             }
             
         if tool_type == "brave-search":
@@ -119,15 +302,17 @@ async def execute_tool(state: GraphState, config: Dict) -> Dict[str, Any]:
                 config["configurable"]["mcp_server_config"],
                 query
             )
+        elif tool_type == "puppeteer":
+            return await execute_puppeteer(config, query)
+        elif tool_type in config["configurable"]["mcp_server_config"]["mcpServers"]:
+            return await execute_with_model(config, tool_type, query)
         else:
             return {
-                "messages": [AIMessage(content=f"Unknown tool: {tool_type}")],
-                "tool_outputs": []
+                "messages": [AIMessage(content=f"Unknown tool: {tool_type}")]
             }
             
     except Exception as e:
         logger.error(f"Tool execution error: {e}")
         return {
-            "messages": [AIMessage(content=f"Error: {str(e)}")],
-            "tool_outputs": []
+            "messages": [AIMessage(content=f"Error: {str(e)}")]
         }
\ No newline at end of file
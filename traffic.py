@@ -0,0 +1,257 @@
+"""
+MCP and LLM traffic record/replay.
+
+Recording (MCP_RECORD_PATH) appends one compact JSON line per exchange:
+incoming requests, MCP session calls and chat model responses, each with
+its start offset and duration. Replay (MCP_REPLAY_PATH) serves those
+exchanges back without starting servers or calling providers, sleeping for
+the recorded duration divided by MCP_REPLAY_SPEED (0 replays instantly).
+This lets routing, graph and state handling be load-tested offline against
+production-shaped traffic.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional, Sequence
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage, SystemMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult, LLMResult
+from mcp.types import CallToolResult, ListPromptsResult, ListResourcesResult, ListToolsResult
+
+logger = logging.getLogger(__name__)
+
+_RESULT_TYPES = {
+    "list_tools": ListToolsResult,
+    "list_prompts": ListPromptsResult,
+    "list_resources": ListResourcesResult,
+    "call_tool": CallToolResult,
+}
+
+def request_key(payload: Any) -> str:
+    """Short stable hash used to match a replayed request to its recording"""
+    return hashlib.sha1(
+        json.dumps(payload, sort_keys=True, default=str).encode()
+    ).hexdigest()[:16]
+
+class TrafficRecorder:
+    """Appends exchanges to the record file.
+
+    Each line is written with a single write to an O_APPEND descriptor, so
+    worker processes forked with the recorder can share the file without
+    interleaving or overwriting each other's lines.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._lock = threading.Lock()
+        self._origin = time.monotonic()
+
+    def offset(self) -> float:
+        return time.monotonic() - self._origin
+
+    def record(self, kind: str, source: str, method: str, params: Any, response: Any,
+               started: float, duration: float, error: Optional[str] = None) -> None:
+        entry = {
+            "k": kind, "s": source, "m": method, "q": request_key(params),
+            "p": params, "r": response, "t": round(started, 6), "d": round(duration, 6),
+        }
+        if error is not None:
+            entry["e"] = error
+        line = json.dumps(entry, separators=(",", ":"), default=str) + "\n"
+        with self._lock:
+            os.write(self._fd, line.encode("utf-8"))
+
+    def close(self) -> None:
+        with self._lock:
+            os.close(self._fd)
+
+class ReplayLog:
+    """Recorded exchanges indexed by (kind, source, method, request key).
+
+    Lookups fall back to the next recorded exchange for the same
+    (kind, source, method) when the exact request was not recorded.
+    """
+
+    def __init__(self, path: str, speed: float = 1.0):
+        self.path = path
+        self.speed = speed
+        self.entries: List[Dict[str, Any]] = []
+        self._exact: Dict[tuple, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._by_method: Dict[tuple, Deque[Dict[str, Any]]] = defaultdict(deque)
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    self._add(json.loads(line))
+
+    def _add(self, entry: Dict[str, Any]) -> None:
+        self.entries.append(entry)
+        self._exact[(entry["k"], entry["s"], entry["m"], entry["q"])].append(entry)
+        self._by_method[(entry["k"], entry["s"], entry["m"])].append(entry)
+
+    def requests(self) -> List[Dict[str, Any]]:
+        """Recorded entry-point requests, in arrival order"""
+        return [entry for entry in self.entries if entry["k"] == "request"]
+
+    def lookup(self, kind: str, source: str, method: str, params: Any) -> Dict[str, Any]:
+        for queue in (
+            self._exact.get((kind, source, method, request_key(params))),
+            self._by_method.get((kind, source, method)),
+        ):
+            if queue:
+                # Rotate so repeated requests cycle through all recordings
+                entry = queue[0]
+                queue.rotate(-1)
+                return entry
+        raise LookupError(f"No recorded {kind} exchange for {source}.{method}")
+
+    async def wait(self, entry: Dict[str, Any]) -> None:
+        if self.speed > 0 and entry.get("d"):
+            await asyncio.sleep(entry["d"] / self.speed)
+
+class RecordingSession:
+    """Proxy around a ClientSession that records every call"""
+
+    def __init__(self, server_name: str, session: Any, recorder: TrafficRecorder):
+        self._server_name = server_name
+        self._session = session
+        self._recorder = recorder
+
+    async def _record(self, method: str, params: Dict[str, Any], call):
+        started = self._recorder.offset()
+        try:
+            result = await call
+        except Exception as e:
+            self._recorder.record("mcp", self._server_name, method, params, None,
+                                  started, self._recorder.offset() - started, str(e))
+            raise
+        self._recorder.record("mcp", self._server_name, method, params,
+                              result.model_dump(mode="json", exclude_none=True),
+                              started, self._recorder.offset() - started)
+        return result
+
+    async def list_tools(self):
+        return await self._record("list_tools", {}, self._session.list_tools())
+
+    async def list_prompts(self):
+        return await self._record("list_prompts", {}, self._session.list_prompts())
+
+    async def list_resources(self):
+        return await self._record("list_resources", {}, self._session.list_resources())
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None):
+        params = {"name": name, "arguments": arguments or {}}
+        return await self._record("call_tool", params, self._session.call_tool(name, arguments=arguments))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._session, name)
+
+class ReplaySession:
+    """Serves recorded MCP exchanges through the ClientSession surface"""
+
+    def __init__(self, server_name: str, log: ReplayLog):
+        self._server_name = server_name
+        self._log = log
+
+    async def _replay(self, method: str, params: Dict[str, Any]):
+        entry = self._log.lookup("mcp", self._server_name, method, params)
+        await self._log.wait(entry)
+        if entry.get("e") is not None:
+            raise RuntimeError(entry["e"])
+        return _RESULT_TYPES[method].model_validate(entry["r"])
+
+    async def initialize(self) -> None:
+        pass
+
+    async def list_tools(self):
+        return await self._replay("list_tools", {})
+
+    async def list_prompts(self):
+        return await self._replay("list_prompts", {})
+
+    async def list_resources(self):
+        return await self._replay("list_resources", {})
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None):
+        return await self._replay("call_tool", {"name": name, "arguments": arguments or {}})
+
+def _llm_params(messages: Sequence[BaseMessage]) -> List[Dict[str, Any]]:
+    # System prompts carry timestamps and message ids are random, so only the
+    # type and content of the conversation messages form the match key
+    return [{"type": m.type, "content": m.content} for m in messages if not isinstance(m, SystemMessage)]
+
+class LLMRecordingCallback(BaseCallbackHandler):
+    """Records chat model responses and latency through LangChain callbacks"""
+
+    def __init__(self, recorder: TrafficRecorder, model_name: str):
+        self.recorder = recorder
+        self.model_name = model_name
+        self._pending: Dict[UUID, tuple] = {}
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[BaseMessage]],
+                            *, run_id: UUID, **kwargs: Any) -> None:
+        self._pending[run_id] = (self.recorder.offset(), _llm_params(messages[0]))
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        started, params = self._pending.pop(run_id, (self.recorder.offset(), []))
+        generation = response.generations[0][0]
+        self.recorder.record("llm", self.model_name, "invoke", params,
+                             message_to_dict(generation.message),
+                             started, self.recorder.offset() - started)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        started, params = self._pending.pop(run_id, (self.recorder.offset(), []))
+        self.recorder.record("llm", self.model_name, "invoke", params, None,
+                             started, self.recorder.offset() - started, str(error))
+
+class ReplayChatModel(BaseChatModel):
+    """Chat model that answers from a replay log instead of a provider"""
+
+    model_name: str
+    log: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        # Recorded responses already contain any tool calls
+        return self
+
+    def _lookup(self, messages: List[BaseMessage]) -> tuple:
+        entry = self.log.lookup("llm", self.model_name, "invoke", _llm_params(messages))
+        if entry.get("e") is not None:
+            raise RuntimeError(entry["e"])
+        message = messages_from_dict([entry["r"]])[0]
+        return entry, ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        return self._lookup(messages)[1]
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        entry, result = self._lookup(messages)
+        await self.log.wait(entry)
+        return result
+
+def _recorder_from_env() -> Optional[TrafficRecorder]:
+    path = os.getenv("MCP_RECORD_PATH")
+    return TrafficRecorder(path) if path else None
+
+def _replay_from_env() -> Optional[ReplayLog]:
+    path = os.getenv("MCP_REPLAY_PATH")
+    if not path:
+        return None
+    log = ReplayLog(path, speed=float(os.getenv("MCP_REPLAY_SPEED", "1")))
+    logger.info(f"Replaying {len(log.entries)} recorded exchanges from {path}")
+    return log
+
+recorder = _recorder_from_env()
+replay_log = _replay_from_env()
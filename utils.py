@@ -6,8 +6,11 @@ from typing import List, Sequence
 
 from langchain_core.messages import BaseMessage, HumanMessage
 from langchain_core.documents import Document
+from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_openai import ChatOpenAI
 
+from src.langgraph_mcp import traffic
+
 def get_message_text(message: BaseMessage) -> str:
     """Extract text content from a message.
     
@@ -32,8 +35,19 @@ def format_docs(docs: Sequence[Document]) -> str:
     """
     return "\n\n".join(doc.page_content for doc in docs)
 
-def load_chat_model(model_string: str) -> ChatOpenAI:
-    """Load a chat model based on a model string."""
+def load_chat_model(model_string: str) -> BaseChatModel:
+    """Load a chat model based on a model string.
+
+    Under traffic replay a ReplayChatModel serving recorded responses is
+    returned; under recording, responses are captured via a callback.
+    """
+    if traffic.replay_log is not None:
+        return traffic.ReplayChatModel(model_name=model_string, log=traffic.replay_log)
+    callbacks = (
+        [traffic.LLMRecordingCallback(traffic.recorder, model_string)]
+        if traffic.recorder is not None else None
+    )
+
     if "/" not in model_string:
         # Default to OpenAI if no provider specified
         provider = "openai"
@@ -46,6 +60,18 @@ def load_chat_model(model_string: str) -> ChatOpenAI:
             model=model,
             temperature=0,
             api_key=os.getenv("OPENAI_API_KEY"),
+            callbacks=callbacks,
+        )
+    elif provider == "anthropic":
+        try:
+            from langchain_anthropic import ChatAnthropic
+        except ImportError as e:
+            raise ImportError("Anthropic models require the langchain-anthropic package") from e
+        return ChatAnthropic(
+            model=model,
+            temperature=0,
+            api_key=os.getenv("ANTHROPIC_API_KEY"),
+            callbacks=callbacks,
         )
     else:
         raise ValueError(f"Unsupported model provider: {provider}")
\ No newline at end of file